@@ -0,0 +1,216 @@
+""" Module to collect the statistics of the BigQuery jobs run by a BigQueryExecutor,
+e.g. during a pipeline run
+"""
+import logging
+import threading
+from collections import deque
+import pandas as pd
+from google.cloud import bigquery
+from pygyver.etl.lib import bq_default_dataset
+from pygyver.etl.lib import bq_default_project
+
+
+def elapsed_ms(start, end):
+    """ Milliseconds between two datetimes, None if any is missing """
+    if start is None or end is None:
+        return None
+    return int((end - start).total_seconds() * 1000)
+
+
+def job_statistics(job, task=None, table=None):
+    """ Returns the statistics of a BigQuery job as a dict.
+
+    Parameters:
+        job (Job object): BigQuery job, e.g. a QueryJob or a LoadJob.
+        task (string): BigQueryExecutor method which ran the job, e.g. 'create_table'.
+        table (string): table the job is about, as project.dataset.table.
+        Defaults to the job destination.
+
+    Returns:
+        dict with the job id and type, the table and partition, the queue and wall times in
+        milliseconds, the bytes processed and billed, the slot milliseconds and the cache hit.
+    """
+    partition = None
+    destination = getattr(job, 'destination', None)
+    if table is None and destination is not None:
+        table = f"{destination.project}.{destination.dataset_id}.{destination.table_id}"
+    if table is not None and '$' in table:
+        table, partition = table.split('$', 1)
+    error_result = getattr(job, 'error_result', None)
+    return {
+        "task": task or job.job_type,
+        "table": table,
+        "partition": partition,
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "state": job.state,
+        "error": error_result.get('message') if error_result else None,
+        "created": job.created,
+        "started": job.started,
+        "ended": job.ended,
+        "queue_ms": elapsed_ms(job.created, job.started),
+        "wall_ms": elapsed_ms(job.created, job.ended),
+        "total_bytes_processed": getattr(job, 'total_bytes_processed', None),
+        "total_bytes_billed": getattr(job, 'total_bytes_billed', None),
+        "total_slot_ms": getattr(job, 'slot_millis', None),
+        "cache_hit": getattr(job, 'cache_hit', None)
+    }
+
+
+class RunSummary:
+    """ Statistics of the BigQuery jobs waited for by a BigQueryExecutor, one record per job.
+
+    Only the last max_records records are kept in memory, so that a long-lived executor does not
+    grow without bound: totals and tables are computed over them. Use clear() to start a new run.
+
+    Parameters:
+        audit_log (BigQueryAuditLog): streams each record to a BigQuery audit table.
+        Defaults to None.
+        max_records (int): number of records kept. Defaults to 10000. None keeps them all.
+
+    Example:
+        >>> bq = BigQueryExecutor()
+        >>> bq.create_table(table_id="table1", sql="SELECT 1 AS a")
+        >>> bq.summary.top_tables(by="total_slot_ms", n=5)
+    """
+    def __init__(self, audit_log=None, max_records=10000):
+        self.audit_log = audit_log
+        self.max_records = max_records
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=max_records)
+
+    def __repr__(self):
+        totals = self.totals()
+        return "RunSummary(jobs={}, wall_ms={}, total_bytes_processed={}, total_slot_ms={})".format(
+            totals['jobs'],
+            totals['wall_ms'],
+            totals['total_bytes_processed'],
+            totals['total_slot_ms']
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        """ Adds the record of a job, and streams it to the audit table if any. """
+        with self.lock:
+            self.records.append(record)
+        if self.audit_log is not None:
+            try:
+                self.audit_log.record(record)
+            except Exception:
+                logging.exception('Failed to record job %s in the audit table', record['job_id'])
+
+    def clear(self):
+        """ Removes all the records. """
+        with self.lock:
+            self.records.clear()
+
+    def totals(self):
+        """ Returns the number of jobs and the sums of their wall times, bytes processed
+        and slot milliseconds.
+        """
+        with self.lock:
+            records = list(self.records)
+        return {
+            "jobs": len(records),
+            "wall_ms": sum(record['wall_ms'] or 0 for record in records),
+            "total_bytes_processed": sum(
+                record['total_bytes_processed'] or 0 for record in records
+            ),
+            "total_slot_ms": sum(record['total_slot_ms'] or 0 for record in records)
+        }
+
+    def to_dataframe(self):
+        """ Returns the records as a pandas DataFrame, one row per job. """
+        with self.lock:
+            return pd.DataFrame(list(self.records), columns=list(audit_columns()))
+
+    def by_table(self):
+        """ Returns a DataFrame with the jobs, wall time, bytes processed and slot milliseconds
+        summed per table, sorted by decreasing slot milliseconds, and the share of the slot
+        milliseconds of each table.
+        """
+        data = self.to_dataframe()
+        data['table'] = data['table'].fillna('')
+        grouped = data.groupby('table').agg(
+            jobs=('job_id', 'count'),
+            wall_ms=('wall_ms', 'sum'),
+            queue_ms=('queue_ms', 'sum'),
+            total_bytes_processed=('total_bytes_processed', 'sum'),
+            total_slot_ms=('total_slot_ms', 'sum')
+        ).sort_values('total_slot_ms', ascending=False)
+        total_slot_ms = grouped['total_slot_ms'].sum()
+        grouped['slot_share'] = grouped['total_slot_ms'] / total_slot_ms if total_slot_ms else 0.0
+        return grouped.reset_index()
+
+    def top_tables(self, by='total_slot_ms', n=10):
+        """ Returns the n tables with the highest sum of by, e.g. 'total_slot_ms',
+        'total_bytes_processed' or 'wall_ms'.
+        """
+        return self.by_table().sort_values(by, ascending=False).head(n).reset_index(drop=True)
+
+
+class BigQueryAuditLog:
+    """ Streams job statistics to a BigQuery audit table, one row per job.
+
+    Parameters:
+        bq (BigQueryExecutor): BigQuery handler.
+        table_id (string): BigQuery audit table ID. Created if it does not exist.
+        dataset_id (string): BigQuery dataset ID.
+        project_id (string): BigQuery project ID.
+        run_id (string): identifies the run in the audit table.
+    """
+    def __init__(self, bq, table_id, dataset_id=bq_default_dataset(),
+                 project_id=bq_default_project(), run_id=None):
+        self.bq = bq
+        self.table_id = table_id
+        self.dataset_id = dataset_id
+        self.project_id = project_id
+        self.run_id = run_id
+        table = bigquery.Table(
+            self.bq.get_table_ref(dataset_id, table_id, project_id=project_id),
+            schema=audit_schema()
+        )
+        self.bq.client.create_table(table, exists_ok=True)
+
+    def record(self, record):
+        """ Streams the record of a job to the audit table. """
+        row = {"run_id": self.run_id}
+        for column, value in record.items():
+            row[column] = value.isoformat() if hasattr(value, 'isoformat') else value
+        self.bq.insert_rows_json(
+            dataset_id=self.dataset_id,
+            table_id=self.table_id,
+            rows=[row],
+            project_id=self.project_id
+        )
+
+
+def audit_columns():
+    """ Columns of the job statistics records and their BigQuery types """
+    return {
+        "task": "STRING",
+        "table": "STRING",
+        "partition": "STRING",
+        "job_id": "STRING",
+        "job_type": "STRING",
+        "state": "STRING",
+        "error": "STRING",
+        "created": "TIMESTAMP",
+        "started": "TIMESTAMP",
+        "ended": "TIMESTAMP",
+        "queue_ms": "INTEGER",
+        "wall_ms": "INTEGER",
+        "total_bytes_processed": "INTEGER",
+        "total_bytes_billed": "INTEGER",
+        "total_slot_ms": "INTEGER",
+        "cache_hit": "BOOLEAN"
+    }
+
+
+def audit_schema():
+    """ Schema of the BigQuery audit table """
+    return [bigquery.SchemaField("run_id", "STRING")] + [
+        bigquery.SchemaField(column, field_type) for column, field_type in audit_columns().items()
+    ]
@@ -0,0 +1,170 @@
+""" Module to build the data quality checks of a BigQuery table, all the checks of a table being
+fused into a single query """
+from pygyver.etl.db import sql_literal
+from pygyver.etl.lib import bq_default_dataset
+from pygyver.etl.lib import bq_default_project
+
+
+def check_types():
+    """ Check types which can be declared under checks in the YAML file of a pipeline """
+    return ['unique', 'not_null', 'accepted_values', 'row_count', 'freshness', 'relationships']
+
+
+def build_checks(checks=None, primary_key=None, previous_row_count=None):
+    """ Returns the list of checks of a table, one dict per check and column.
+
+    Parameters:
+        checks (dict): checks by type, e.g.
+            {
+                "not_null": ["col1", "col2"],
+                "accepted_values": {"status": ["open", "closed"]},
+                "row_count": {"min": 1, "max": 1000000, "max_delta": 0.2},
+                "freshness": {"column": "updated_at", "max_age_hours": 24},
+                "relationships": [
+                    {
+                        "column": "product_id",
+                        "table_id": "product",
+                        "dataset_id": "reporting",
+                        "field": "id"
+                    }
+                ]
+            }
+        primary_key (list): columns the table should be unique on, e.g. the pk of the YAML file.
+        previous_row_count (int): number of rows of the table before it was created, compared to
+        the current number of rows for row_count max_delta.
+
+    Returns:
+        list of dicts with keys 'check', 'column' and the parameters of the check.
+    """
+    checks = checks or {}
+    unknown = set(checks) - set(check_types())
+    if unknown:
+        raise ValueError("Unknown check type(s): {}".format(', '.join(sorted(unknown))))
+    result = []
+    unique = checks.get('unique', primary_key)
+    if unique:
+        result.append({"check": "unique", "column": ', '.join(unique), "columns": list(unique)})
+    for column in checks.get('not_null', []):
+        result.append({"check": "not_null", "column": column})
+    for column, values in checks.get('accepted_values', {}).items():
+        result.append({"check": "accepted_values", "column": column, "values": list(values)})
+    if 'row_count' in checks:
+        row_count = checks['row_count'] or {}
+        result.append({
+            "check": "row_count",
+            "column": None,
+            "min": row_count.get('min', 1),
+            "max": row_count.get('max'),
+            "max_delta": row_count.get('max_delta'),
+            "previous_row_count": previous_row_count
+        })
+    if 'freshness' in checks:
+        result.append({
+            "check": "freshness",
+            "column": checks['freshness']['column'],
+            "max_age_hours": checks['freshness']['max_age_hours']
+        })
+    for relationship in checks.get('relationships', []):
+        result.append({
+            "check": "relationships",
+            "column": relationship['column'],
+            "table": "{}.{}.{}".format(
+                relationship.get('project_id', bq_default_project()),
+                relationship.get('dataset_id', bq_default_dataset()),
+                relationship['table_id']
+            ),
+            "field": relationship['field']
+        })
+    return result
+
+
+def quote_column(column, alias='t'):
+    """ Returns the column of the table aliased alias, quoted with backticks, e.g. t.`order`. """
+    return f"{alias}.`{column}`"
+
+
+def check_expression(check, reference=None):
+    """ Returns the SQL expression computing the value of a check over the table aliased t.
+
+    Parameters:
+        check (dict): check, as returned by build_checks.
+        reference (string): alias of the referenced table joined for a relationships check.
+    """
+    if check['check'] == 'unique':
+        columns = ', '.join(quote_column(column) for column in check['columns'])
+        return f"COUNT(*) - COUNT(DISTINCT TO_JSON_STRING(STRUCT({columns})))"
+    column = quote_column(check['column']) if check['column'] is not None else None
+    if check['check'] == 'not_null':
+        return f"COUNTIF({column} IS NULL)"
+    if check['check'] == 'accepted_values':
+        values = ', '.join(sql_literal(value) for value in check['values'])
+        return f"COUNTIF({column} IS NOT NULL AND {column} NOT IN ({values}))"
+    if check['check'] == 'row_count':
+        return "COUNT(*)"
+    if check['check'] == 'freshness':
+        return (
+            f"TIMESTAMP_DIFF(CURRENT_TIMESTAMP(), CAST(MAX({column}) AS TIMESTAMP), SECOND) / 3600"
+        )
+    if check['check'] == 'relationships':
+        return f"COUNTIF({column} IS NOT NULL AND {reference}.key IS NULL)"
+    raise ValueError(f"Unknown check type: {check['check']}")
+
+
+def check_query(table, checks):
+    """ Returns the query computing the values of all the checks of a table in a single scan,
+    one column check_<i> per check. The tables referenced by relationships checks are joined on
+    their distinct keys, so that the rows of the table are not duplicated.
+
+    Parameters:
+        table (string): table checked, as project.dataset.table.
+        checks (list): checks, as returned by build_checks.
+    """
+    expressions, joins = [], []
+    for i, check in enumerate(checks):
+        reference = None
+        if check['check'] == 'relationships':
+            reference = f"reference_{len(joins)}"
+            joins.append(
+                f"LEFT JOIN (SELECT DISTINCT `{check['field']}` AS key FROM `{check['table']}`) "
+                f"AS {reference} ON {quote_column(check['column'])} = {reference}.key"
+            )
+        expressions.append(f"{check_expression(check, reference)} AS check_{i}")
+    return "SELECT\n    {}\nFROM `{}` AS t{}".format(
+        ',\n    '.join(expressions),
+        table,
+        ''.join(f"\n{join}" for join in joins)
+    )
+
+
+def check_passed(check, value):
+    """ Returns True if the value computed for the check passes it. """
+    if check['check'] == 'row_count':
+        if check['min'] is not None and value < check['min']:
+            return False
+        if check['max'] is not None and value > check['max']:
+            return False
+        if check['max_delta'] is not None and check['previous_row_count']:
+            delta = abs(value - check['previous_row_count']) / check['previous_row_count']
+            return delta <= check['max_delta']
+        return True
+    if check['check'] == 'freshness':
+        return value is not None and value <= check['max_age_hours']
+    return value == 0
+
+
+def check_results(table, checks, row):
+    """ Returns the result of each check from the row returned by check_query.
+
+    Returns:
+        list of dicts with keys 'table', 'check', 'column', 'value' and 'passed'.
+    """
+    return [
+        {
+            "table": table,
+            "check": check['check'],
+            "column": check['column'],
+            "value": row[f"check_{i}"],
+            "passed": check_passed(check, row[f"check_{i}"])
+        }
+        for i, check in enumerate(checks)
+    ]
@@ -0,0 +1,162 @@
+""" Module to share the Google credentials and clients of a process, so that the executors do not
+reparse the service account file and rebuild a client, its HTTP session and its token each time
+"""
+import os
+import threading
+import gspread
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from google.cloud import bigquery_storage_v1
+from google.cloud import storage
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+from pygyver.etl import lib
+
+
+_lock = threading.RLock()
+_credentials = {}
+_clients = {}
+
+
+def bigquery_scopes():
+    """ Scopes of the BigQuery credentials """
+    return (
+        "https://www.googleapis.com/auth/drive",
+        "https://www.googleapis.com/auth/bigquery"
+    )
+
+
+def gspread_scopes():
+    """ Scopes of the Google Spreadsheet credentials """
+    return (
+        "https://spreadsheets.google.com/feeds",
+        "https://www.googleapis.com/auth/drive"
+    )
+
+
+def storage_scopes():
+    """ Scopes of the Google Cloud Storage credentials. They must be set explicitly, as a client
+    given an HTTP session does not scope its credentials itself.
+    """
+    return (
+        "https://www.googleapis.com/auth/devstorage.full_control",
+    )
+
+
+def http_pool_size():
+    """ Number of connections kept alive per host by the shared HTTP sessions.
+    Defaults to 50, or HTTP_POOL_SIZE environment variable.
+    """
+    return int(os.getenv("HTTP_POOL_SIZE", "50"))
+
+
+def get_credentials(scopes=None):
+    """ Returns the service account credentials of GOOGLE_APPLICATION_CREDENTIALS for the scopes,
+    parsed once per process.
+
+    Parameters:
+        scopes (tuple): OAuth scopes. Defaults to None, the default scopes of the client.
+
+    Returns:
+        Credentials object.
+    """
+    lib.bq_token_file_valid()
+    key = (lib.bq_token_file_path(), tuple(scopes) if scopes else None)
+    with _lock:
+        if key not in _credentials:
+            _credentials[key] = service_account.Credentials.from_service_account_file(
+                key[0],
+                scopes=key[1]
+            )
+        return _credentials[key]
+
+
+def authorized_session(credentials):
+    """ Returns an HTTP session authorized with the credentials, which keeps up to http_pool_size()
+    connections alive per host.
+    """
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(
+        pool_connections=http_pool_size(),
+        pool_maxsize=http_pool_size()
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def get_client(kind, project_id=None, scopes=None, factory=None):
+    """ Returns the client of a kind for the project and scopes, created once per process with
+    factory.
+
+    Parameters:
+        kind (string): kind of client, e.g. 'bigquery'.
+        project_id (string): project of the client.
+        scopes (tuple): OAuth scopes of the credentials of the client.
+        factory (function): creates the client from the credentials and the project.
+
+    Returns:
+        the client.
+    """
+    key = (kind, lib.bq_token_file_path(), project_id, tuple(scopes) if scopes else None)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory(get_credentials(scopes), project_id)
+        return _clients[key]
+
+
+def bigquery_client(project_id):
+    """ Returns the shared BigQuery client of the project. """
+    return get_client(
+        'bigquery',
+        project_id=project_id,
+        scopes=bigquery_scopes(),
+        factory=lambda credentials, project: bigquery.Client(
+            project=project,
+            credentials=credentials,
+            _http=authorized_session(credentials)
+        )
+    )
+
+
+def bigquery_storage_client():
+    """ Returns the shared BigQuery Storage Read API client. """
+    return get_client(
+        'bigquery_storage',
+        scopes=bigquery_scopes(),
+        factory=lambda credentials, project: bigquery_storage_v1.BigQueryReadClient(
+            credentials=credentials
+        )
+    )
+
+
+def storage_client(project_id):
+    """ Returns the shared Google Cloud Storage client of the project. """
+    return get_client(
+        'storage',
+        project_id=project_id,
+        scopes=storage_scopes(),
+        factory=lambda credentials, project: storage.Client(
+            project=project,
+            credentials=credentials,
+            _http=authorized_session(credentials)
+        )
+    )
+
+
+def gspread_client():
+    """ Returns the shared Google Spreadsheet client. """
+    def create(credentials, project):
+        client = gspread.Client(auth=credentials)
+        client.session = authorized_session(credentials)
+        return client
+
+    return get_client('gspread', scopes=gspread_scopes(), factory=create)
+
+
+def clear():
+    """ Removes the shared credentials and clients, e.g. after GOOGLE_APPLICATION_CREDENTIALS
+    changed.
+    """
+    with _lock:
+        _credentials.clear()
+        _clients.clear()
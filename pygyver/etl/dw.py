@@ -3,15 +3,20 @@ import os
 import re
 import logging
 import time
+import uuid
 import json
+import string
+import datetime
+import hashlib
+import threading
+import concurrent.futures
 import pandas as pd
+import pyarrow as pa
 from pandas._testing import assert_frame_equal
 from google.cloud import bigquery
+from google.cloud import bigquery_storage_v1
 from google.cloud.exceptions import NotFound
-from google.oauth2 import service_account
 from google.api_core import exceptions
-from pygyver.etl.lib import bq_token_file_valid
-from pygyver.etl.lib import bq_token_file_path
 from pygyver.etl.lib import bq_default_project
 from pygyver.etl.lib import bq_default_dataset
 from pygyver.etl.lib import gcs_default_bucket
@@ -19,11 +24,20 @@ from pygyver.etl.lib import read_table_schema_from_file
 from pygyver.etl.lib import bq_start_date
 from pygyver.etl.lib import bq_end_date
 from pygyver.etl.lib import set_write_disposition, set_priority
+from pygyver.etl.lib import extract_table_references
+from pygyver.etl import clients
 from pygyver.etl.toolkit import date_lister
 from pygyver.etl.toolkit import validate_date
+from pygyver.etl.toolkit import read_sql_file
 from pygyver.etl.gs import load_gs_to_dataframe
 from pygyver.etl.storage import GCSExecutor
 from pygyver.etl.db import DBExecutor
+from pygyver.etl.db import incremental_query
+from pygyver.etl.audit import RunSummary
+from pygyver.etl.audit import job_statistics
+from pygyver.etl.checks import build_checks
+from pygyver.etl.checks import check_query
+from pygyver.etl.checks import check_results
 
 
 class BigQueryExecutorError(Exception):
@@ -46,10 +60,435 @@ def forbiden_kwargs():
     return ['partition_date']
 
 
+def partition_modification_rate():
+    """ BigQuery quota of partition modifications per table: (operations, seconds) """
+    return (50, 10)
+
+
+def non_deterministic_functions():
+    return ['CURRENT_DATE', 'CURRENT_DATETIME', 'CURRENT_TIME', 'CURRENT_TIMESTAMP',
+            'NOW', 'RAND', 'GENERATE_UUID', 'SESSION_USER']
+
+
+def staging_table_id(table_id):
+    """ ID of a new staging table of a table, e.g. the delta of an incremental load before it is
+    merged. The ID is unique, so that concurrent merges or staged swaps of the table do not share a
+    staging table.
+    """
+    return f"{table_id}__staging_{uuid.uuid4().hex[:12]}"
+
+
+def standard_sql_type(field_type):
+    """ Returns the standard SQL name of a BigQuery field type, e.g. INT64 for INTEGER. """
+    field_type = field_type.upper()
+    return {
+        'INTEGER': 'INT64', 'FLOAT': 'FLOAT64', 'BOOLEAN': 'BOOL', 'RECORD': 'STRUCT'
+    }.get(field_type, field_type)
+
+
+def legacy_sql_type(field_type):
+    """ Returns the legacy SQL name of a BigQuery field type, e.g. INTEGER for INT64. """
+    field_type = field_type.upper()
+    legacy_types = {'INT64': 'INTEGER', 'FLOAT64': 'FLOAT', 'BOOL': 'BOOLEAN', 'STRUCT': 'RECORD'}
+    return legacy_types.get(field_type, field_type)
+
+
+def split_struct_fields(fields):
+    """ Splits the fields of a STRUCT type on its top-level commas,
+    e.g. 'a INT64, b STRUCT<c STRING, d DATE>'.
+    """
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(fields):
+        if char in '<(':
+            depth += 1
+        elif char in '>)':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(fields[start:i].strip())
+            start = i + 1
+    parts.append(fields[start:].strip())
+    return [part for part in parts if part]
+
+
+def schema_field_from_type(name, data_type, nullable=True, descriptions=None, path=None):
+    """ Returns the SchemaField of a column from its data_type in INFORMATION_SCHEMA.COLUMNS,
+    e.g. ARRAY<STRUCT<a INT64 NOT NULL, b STRING>>.
+
+    Parameters:
+        name (string): column name.
+        data_type (string): standard SQL type of the column.
+        nullable (bool): is_nullable of the column. Defaults to True.
+        descriptions (dict): descriptions of the column and its nested fields, by field path.
+        path (string): field path of the column. Defaults to name.
+    """
+    descriptions = descriptions or {}
+    path = path or name
+    data_type = data_type.strip()
+    if data_type.upper().endswith(' NOT NULL'):
+        data_type = data_type[:-len(' NOT NULL')].strip()
+        nullable = False
+    mode = 'NULLABLE' if nullable else 'REQUIRED'
+    if data_type.upper().startswith('ARRAY<'):
+        data_type = data_type[len('ARRAY<'):-1].strip()
+        mode = 'REPEATED'
+    fields = ()
+    if data_type.upper().startswith('STRUCT<'):
+        fields = []
+        for part in split_struct_fields(data_type[len('STRUCT<'):-1]):
+            field_name, field_type = part.split(None, 1)
+            field_name = field_name.strip('`')
+            fields.append(schema_field_from_type(
+                field_name,
+                field_type,
+                descriptions=descriptions,
+                path=f"{path}.{field_name}"
+            ))
+        data_type = 'STRUCT'
+    return bigquery.SchemaField(
+        name,
+        legacy_sql_type(data_type.split('(')[0].strip()),
+        mode=mode,
+        description=descriptions.get(path),
+        fields=fields
+    )
+
+
+def table_attributes_query(project_id, dataset_id):
+    """ Returns the query reading the columns, the descriptions of the fields and the options of
+    the tables of a dataset from its INFORMATION_SCHEMA, one row per table.
+    """
+    information_schema = f"`{project_id}.{dataset_id}.INFORMATION_SCHEMA"
+    return (
+        "WITH columns AS (\n"
+        "    SELECT table_name, ARRAY_AGG(\n"
+        "        STRUCT(column_name, is_nullable, data_type, is_partitioning_column)\n"
+        "        ORDER BY ordinal_position\n"
+        "    ) AS columns\n"
+        f"    FROM {information_schema}.COLUMNS`\n"
+        "    GROUP BY table_name\n"
+        "), descriptions AS (\n"
+        "    SELECT table_name, ARRAY_AGG(STRUCT(field_path, description)) AS descriptions\n"
+        f"    FROM {information_schema}.COLUMN_FIELD_PATHS`\n"
+        "    WHERE description IS NOT NULL\n"
+        "    GROUP BY table_name\n"
+        "), options AS (\n"
+        "    SELECT table_name, ARRAY_AGG(STRUCT(option_name, option_value)) AS options\n"
+        f"    FROM {information_schema}.TABLE_OPTIONS`\n"
+        "    GROUP BY table_name\n"
+        ")\n"
+        "SELECT table_name, columns, descriptions, options\n"
+        "FROM columns\n"
+        "LEFT JOIN descriptions USING (table_name)\n"
+        "LEFT JOIN options USING (table_name)"
+    )
+
+
+def option_literal(value):
+    """ Returns the value of an option of INFORMATION_SCHEMA.TABLE_OPTIONS, e.g. "a description"
+    or true. None if the option is not set.
+    """
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def merge_casts(schema, source_schema):
+    """ Returns the types the columns of source_schema must be cast to, to be written to the columns
+    of schema, e.g. {'id': 'STRING'} for an INT64 id autodetected by a load into a STRING id.
+    Structs and arrays are not cast.
+    """
+    types = {field.name: field for field in schema}
+    casts = {}
+    for field in source_schema:
+        target = types.get(field.name)
+        if target is None or 'REPEATED' in (field.mode, target.mode):
+            continue
+        target_type = standard_sql_type(target.field_type)
+        if target_type != 'STRUCT' and standard_sql_type(field.field_type) != target_type:
+            casts[field.name] = target_type
+    return casts
+
+
+def merge_statement(table, source_table, columns, pk, casts=None):
+    """ Returns the MERGE statement updating the rows of table matching a row of source_table on the
+    primary key, and inserting the other rows of source_table.
+
+    Parameters:
+        table (string): table merged into, as project.dataset.table.
+        source_table (string): table merged from, as project.dataset.table.
+        columns (list): columns of source_table.
+        pk (list): primary key columns.
+        casts (dict): types the source columns are cast to, as returned by merge_casts. Defaults to
+        None.
+    """
+    casts = casts or {}
+
+    def source(column):
+        if column in casts:
+            return f"CAST(source.`{column}` AS {casts[column]})"
+        return f"source.`{column}`"
+
+    condition = " AND ".join(f"target.`{column}` = {source(column)}" for column in pk)
+    updates = ", ".join(f"`{column}` = {source(column)}" for column in columns if column not in pk)
+    inserted = ", ".join(f"`{column}`" for column in columns)
+    values = ", ".join(source(column) if column in casts else f"`{column}`" for column in columns)
+    sql = f"MERGE `{table}` AS target\nUSING `{source_table}` AS source\nON {condition}\n"
+    if updates:
+        sql += f"WHEN MATCHED THEN UPDATE SET {updates}\n"
+    sql += f"WHEN NOT MATCHED THEN INSERT ({inserted}) VALUES ({values})"
+    return sql
+
+
+def arrow_type(field):
+    """ Returns the pyarrow type of a BigQuery SchemaField. Unknown types, e.g. GEOGRAPHY, are read
+    as strings.
+    """
+    field_type = field.field_type.upper()
+    if field_type in ('RECORD', 'STRUCT'):
+        value_type = pa.struct(
+            [pa.field(sub_field.name, arrow_type(sub_field)) for sub_field in field.fields]
+        )
+    else:
+        value_type = {
+            'STRING': pa.string(),
+            'BYTES': pa.binary(),
+            'INTEGER': pa.int64(),
+            'INT64': pa.int64(),
+            'FLOAT': pa.float64(),
+            'FLOAT64': pa.float64(),
+            'NUMERIC': pa.decimal128(38, 9),
+            'BOOLEAN': pa.bool_(),
+            'BOOL': pa.bool_(),
+            'TIMESTAMP': pa.timestamp('us', tz='UTC'),
+            'DATETIME': pa.timestamp('us'),
+            'DATE': pa.date32(),
+            'TIME': pa.time64('us')
+        }.get(field_type, pa.string())
+    if field.mode == 'REPEATED':
+        return pa.list_(value_type)
+    return value_type
+
+
+def arrow_schema(schema):
+    """ Returns the pyarrow schema of a list of BigQuery SchemaFields. """
+    return pa.schema([pa.field(field.name, arrow_type(field)) for field in schema])
+
+
+def dataframe_arrow_schema(df):
+    """ Returns the pyarrow schema of a DataFrame, e.g. the first chunk of a query result, so that
+    the following chunks are written with it: columns of unknown type (all NULL) are strings, and
+    decimals are NUMERIC (38, 9) whatever the precision of the chunk.
+    """
+    fields = []
+    for field in pa.Schema.from_pandas(df, preserve_index=False):
+        field_type = field.type
+        if pa.types.is_null(field_type):
+            field_type = pa.string()
+        elif pa.types.is_decimal(field_type):
+            field_type = pa.decimal128(38, 9)
+        fields.append(pa.field(field.name, field_type))
+    return pa.schema(fields)
+
+
+def arrow_to_dataframe(table):
+    """ Converts a pyarrow.Table to a DataFrame with nullable integer and boolean dtypes, so that
+    the dtypes of the chunks of a result do not depend on whether a chunk holds NULLs.
+    """
+    return table.to_pandas(
+        types_mapper={pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype()}.get
+    )
+
+
 class SafeDict(dict):
     def __missing__(self, key):
         return '{' + key + '}'
 
+
+class RateLimiter:
+    """ Spaces calls so that at most `calls` calls start every `period` seconds.
+
+    Parameters:
+        calls (int): number of calls.
+        period (int): period in seconds.
+    """
+    def __init__(self, calls, period):
+        self.interval = period / calls
+        self.lock = threading.Lock()
+        self.next_call = 0
+
+    def wait(self):
+        """ Blocks until the next call is allowed. """
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class MetadataCache:
+    """ Time-to-live cache of BigQuery table and dataset metadata.
+
+    Entries are keyed by (project_id, dataset_id, table_id), with table_id None for a dataset.
+    Objects not found are cached as None.
+
+    Listings hold the ids of the tables of a dataset, or of the datasets of a project (dataset_id
+    None), and answer existence questions without fetching each object. Objects invalidated since
+    the listing are not answered by it. Listings have their own lifetime, e.g. the duration of a
+    pipeline run: a listing valid until clear_listings also answers that the objects it misses do
+    not exist, as the objects the executor creates during the run are invalidated or recorded with
+    created. The listing of the tables of a dataset can also hold their attributes.
+
+    Each table and dataset has a generation, incremented when it is invalidated: a value fetched
+    while its key was invalidated, e.g. by another thread creating the table, is not cached.
+
+    Parameters:
+        ttl (int): seconds an entry is valid for. 0 disables the cache.
+    """
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.listings = {}
+        self.generations = {}
+
+    def generation(self, key):
+        """ Generation of a key: of the table or dataset, of its dataset, and of the whole cache.
+        Requires lock.
+        """
+        return (
+            self.generations.get(key, 0),
+            self.generations.get(key[:2], 0),
+            self.generations.get(None, 0)
+        )
+
+    def bump(self, key):
+        """ Increments the generation of a key. Requires lock. """
+        self.generations[key] = self.generations.get(key, 0) + 1
+
+    def get(self, key, fetch):
+        """ Returns the cached value of key, or fetch() if the entry is missing or expired.
+        fetch raising NotFound is cached as None.
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            generation = self.generation(key)
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+        try:
+            value = fetch()
+        except NotFound:
+            value = None
+        if self.ttl > 0:
+            with self.lock:
+                if self.generation(key) == generation:
+                    self.entries[key] = (now, value)
+        return value
+
+    def set_listing(self, project_id, dataset_id, ids, ttl=None, attributes=None):
+        """ Sets the ids of the tables of a dataset, or of the datasets of a project if dataset_id
+        is None, valid for ttl seconds (float('inf') until clear_listings). Defaults to the ttl of
+        the cache. attributes holds the attributes of some of the tables, by table id.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if self.ttl > 0 and ttl > 0:
+            with self.lock:
+                self.listings[(project_id, dataset_id)] = (
+                    time.monotonic() + ttl, set(ids), set(), dict(attributes or {})
+                )
+
+    def listing(self, key, name):
+        """ Returns the listing of key if it is valid and answers name, None otherwise. """
+        with self.lock:
+            entry = self.listings.get(key)
+        if entry is None or time.monotonic() >= entry[0] or name in entry[2]:
+            return None
+        return entry
+
+    def listed(self, project_id, dataset_id, table_id=None):
+        """ Returns whether a dataset, or a table if table_id is set, is in a valid listing.
+        None if no valid listing answers it: only listings valid until clear_listings answer False.
+        """
+        if table_id is None:
+            key, name = (project_id, None), dataset_id
+        else:
+            if self.listed(project_id, dataset_id) is False:
+                return False
+            key, name = (project_id, dataset_id), table_id
+        entry = self.listing(key, name)
+        if entry is None:
+            return None
+        if name in entry[1]:
+            return True
+        return False if entry[0] == float('inf') else None
+
+    def listed_attributes(self, project_id, dataset_id, table_id):
+        """ Returns the attributes of a table held by a valid listing, None if it holds none. """
+        entry = self.listing((project_id, dataset_id), table_id)
+        if entry is None or table_id not in entry[3]:
+            return None
+        return dict(entry[3][table_id])
+
+    def created(self, project_id, dataset_id, table_id=None):
+        """ Invalidates a table or a dataset the executor created, and adds it to the listing of its
+        dataset or project, so that the listing answers it exists. A new dataset is listed as empty,
+        for as long as the listing of its project.
+        """
+        self.invalidate(project_id, dataset_id, table_id)
+        if table_id is not None:
+            key, name = (project_id, dataset_id), table_id.split('$')[0]
+        else:
+            key, name = (project_id, None), dataset_id
+        with self.lock:
+            entry = self.listings.get(key)
+            if entry is not None:
+                entry[1].add(name)
+                entry[2].discard(name)
+                entry[3].pop(name, None)
+            if table_id is None:
+                if entry is not None:
+                    expires = entry[0]
+                elif self.ttl > 0:
+                    expires = time.monotonic() + self.ttl
+                else:
+                    return
+                self.listings[(project_id, dataset_id)] = (expires, set(), set(), {})
+
+    def invalidate(self, project_id, dataset_id, table_id=None):
+        """ Removes the entry of a table, or of a dataset and all its tables if table_id is None.
+        """
+        with self.lock:
+            if table_id is not None:
+                table_id = table_id.split('$')[0]
+                self.bump((project_id, dataset_id, table_id))
+                self.entries.pop((project_id, dataset_id, table_id), None)
+                if (project_id, dataset_id) in self.listings:
+                    self.listings[(project_id, dataset_id)][2].add(table_id)
+                return
+            self.bump((project_id, dataset_id))
+            for key in list(self.entries):
+                if key[:2] == (project_id, dataset_id):
+                    del self.entries[key]
+            self.listings.pop((project_id, dataset_id), None)
+            if (project_id, None) in self.listings:
+                self.listings[(project_id, None)][2].add(dataset_id)
+
+    def clear_listings(self):
+        """ Removes the listings, e.g. at the end of the run they were prefetched for. """
+        with self.lock:
+            self.listings = {}
+
+    def clear(self):
+        with self.lock:
+            self.bump(None)
+            self.entries = {}
+            self.listings = {}
+
+
 @print_kwargs_params
 def read_sql(file, *args, **kwargs):
     ''' Read SQL file and apply arguments/keyword arguments.
@@ -98,6 +537,9 @@ class BigQueryExecutor:
 
     Parameters:
         project_id (sql_file): BigQuery Project. Defaults to BIGQUERY_PROJECT environment variable.
+        metadata_ttl (int): seconds the table and dataset metadata are cached for. Defaults to 60.
+        The cache is invalidated by the creations, deletions, patches and jobs of the executor;
+        0 disables it.
 
     Required:
         GOOGLE_APPLICATION_CREDENTIALS (env variable).
@@ -106,33 +548,177 @@ class BigQueryExecutor:
         client (Client object)
         credentials (Credentials object)
         project_id (string): BigQuery Project. Defaults to BIGQUERY_PROJECT environment variable.
+        summary (RunSummary): statistics of the jobs waited for (table, queue and wall times,
+        bytes processed, slot milliseconds, cache hit and job id).
+        metadata_cache (MetadataCache): table and dataset metadata cache.
 
     Returns:
         a BigQueryExecutor object.
     """
-    def __init__(self):
+    def __init__(self, metadata_ttl=60):
         """ Resets client and credentials.
         """
         self.client = None
         self.credentials = None
+        self.running_jobs = {}
+        self.running_jobs_lock = threading.Lock()
+        self.job_callbacks = {}
+        self.summary = RunSummary()
+        self.metadata_cache = MetadataCache(ttl=metadata_ttl)
+        self.bqstorage_client = None
         self.auth()
 
     def auth(self):
-        """ Sets BigQuery client.
-        """
-        bq_token_file_valid()
-        self.credentials = service_account.Credentials.from_service_account_file(
-            bq_token_file_path(),
-            scopes=[
-                "https://www.googleapis.com/auth/drive",
-                "https://www.googleapis.com/auth/bigquery"
-            ]
-        )
-        self.client = bigquery.Client(
-            project = bq_default_project(),
-            credentials=self.credentials
-        )
+        """ Sets BigQuery client. The credentials and the client are shared by the executors of the
+        process.
+        """
+        self.credentials = clients.get_credentials(clients.bigquery_scopes())
+        self.client = clients.bigquery_client(bq_default_project())
+
+
+    def wait_for_job(self, job, task=None, table=None):
+        """ Waits for a BigQuery job to complete. Meanwhile, the job can be cancelled with
+        cancel_running_jobs. The statistics of the job are then added to the summary, whether the
+        job succeeded or not.
+
+        Parameters:
+            job (Job object): BigQuery job.
+            task (string): method which ran the job, recorded in the summary. Defaults to the job
+            type.
+            table (string): table recorded in the summary, as project.dataset.table. Defaults to the
+            job destination.
+
+        Returns:
+            The result of the job.
+        """
+        with self.running_jobs_lock:
+            self.running_jobs[job.job_id] = job
+        try:
+            result = job.result()
+        finally:
+            with self.running_jobs_lock:
+                self.running_jobs.pop(job.job_id, None)
+            self.invalidate_job_destination(job)
+            self.summary.add(job_statistics(job, task=task, table=table))
+        self.run_job_callbacks(job)
+        return result
+
+    def wait_for_jobs(self, jobs, poll_interval=1, timeout=21600, raise_errors=True, task=None,
+                      reload_cycles=10):
+        """ Waits for many BigQuery jobs from a single thread.
+
+        Instead of a blocking poll per job, each polling cycle lists the jobs completed in the
+        project in one paged call, and only reloads the jobs found completed. Jobs the listing may
+        not return, e.g. created by another principal or in another project, are reloaded every
+        reload_cycles cycles. Meanwhile, the jobs can be cancelled with cancel_running_jobs.
 
+        Parameters:
+            jobs (list of Job objects): BigQuery jobs, e.g. returned by create_table(wait=False).
+            poll_interval (int): seconds between two polling cycles. Defaults to 1.
+            timeout (int): seconds to wait before raising an error. Defaults to 6 hours, the maximum
+            duration of a query job. None waits without limit.
+            raise_errors (bool): raises an error if any job failed. Defaults to True.
+            task (string): method which ran the jobs, recorded in the summary. Defaults to the job
+            type.
+            reload_cycles (int): polling cycles between two reloads of each job still pending.
+            Defaults to 10.
+
+        Returns:
+            List of the jobs, reloaded.
+
+        Raises:
+            BigQueryExecutorError if the timeout is reached or, if raise_errors, if any job failed.
+        """
+        pending = {job.job_id: job for job in jobs if job.state != 'DONE'}
+        with self.running_jobs_lock:
+            self.running_jobs.update(pending)
+        start = time.time()
+        created = [job.created for job in pending.values() if job.created is not None]
+        min_creation_time = min(created) - datetime.timedelta(minutes=1) if created else None
+        cycles = 0
+        try:
+            while pending:
+                cycles += 1
+                done_ids = {
+                    job.job_id for job in self.client.list_jobs(
+                        min_creation_time=min_creation_time,
+                        state_filter='done'
+                    )
+                }
+                for job_id in list(pending):
+                    if job_id in done_ids:
+                        pending.pop(job_id).reload()
+                    elif cycles % reload_cycles == 0:
+                        pending[job_id].reload()
+                        if pending[job_id].state == 'DONE':
+                            pending.pop(job_id)
+                if not pending:
+                    break
+                if timeout is not None and time.time() - start > timeout:
+                    raise BigQueryExecutorError(
+                        "Timeout while waiting for jobs: {}".format(', '.join(pending))
+                    )
+                time.sleep(poll_interval)
+        finally:
+            with self.running_jobs_lock:
+                for job in jobs:
+                    self.running_jobs.pop(job.job_id, None)
+
+        for job in jobs:
+            self.invalidate_job_destination(job)
+            self.summary.add(job_statistics(job, task=task))
+            self.run_job_callbacks(job)
+        failed = [job for job in jobs if job.error_result is not None]
+        for job in failed:
+            logging.error("Job %s failed: %s", job.job_id, job.error_result.get('message'))
+        if failed and raise_errors:
+            raise BigQueryExecutorError(
+                "{} job(s) failed: {}".format(len(failed), ', '.join(job.job_id for job in failed))
+            )
+        return jobs
+
+    def add_job_callback(self, job, callback):
+        """ Registers a function called without arguments once the job succeeded, when it is
+        waited for with wait_for_job or wait_for_jobs, e.g. to set the description of its table.
+        """
+        with self.running_jobs_lock:
+            self.job_callbacks.setdefault(job.job_id, []).append(callback)
+
+    def run_job_callbacks(self, job):
+        """ Calls the callbacks of a completed job if it succeeded, and forgets them. """
+        with self.running_jobs_lock:
+            callbacks = self.job_callbacks.pop(job.job_id, [])
+        if job.error_result is None:
+            for callback in callbacks:
+                callback()
+
+    def invalidate_job_destination(self, job):
+        """ Removes the destination table of a job, and the table of a DDL statement, if any,
+        from the metadata cache.
+        """
+        for attribute in ('destination', 'ddl_target_table'):
+            table = getattr(job, attribute, None)
+            if table is not None:
+                self.metadata_cache.invalidate(table.project, table.dataset_id, table.table_id)
+
+    def cancel_running_jobs(self):
+        """ Requests the cancellation of the jobs being waited for by wait_for_job, e.g. from
+        another thread.
+
+        Returns:
+            List of the job ids for which a cancellation was requested.
+        """
+        with self.running_jobs_lock:
+            jobs = list(self.running_jobs.values())
+        cancelled = []
+        for job in jobs:
+            try:
+                job.cancel()
+                cancelled.append(job.job_id)
+                logging.info("Cancellation requested for job %s", job.job_id)
+            except exceptions.GoogleAPICallError as error:
+                logging.error(error)
+        return cancelled
 
     def get_dataset_ref(self,  dataset_id, project_id=bq_default_project()):
         """ Returns BigQuery DatasetReference object.
@@ -173,13 +759,38 @@ class BigQueryExecutor:
         Returns:
             True is the dataset exists, False otherwise
         """
-        dataset_ref = self.get_dataset_ref(dataset_id,project_id=project_id)
+        listed = self.metadata_cache.listed(project_id, dataset_id)
+        if listed is not None:
+            return listed
         try:
-            self.client.get_dataset(dataset_ref)
+            self.get_dataset(dataset_id, project_id=project_id)
             return True
         except NotFound:
             return False
 
+    def get_dataset(self, dataset_id=bq_default_dataset(), project_id=bq_default_project()):
+        """ Gets a BigQuery dataset, from the metadata cache if it was fetched less than
+        metadata_ttl seconds ago.
+
+        Parameters:
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+
+        Returns:
+            bigquery.Dataset object
+
+        Raises:
+            NotFound if the dataset does not exist.
+        """
+        dataset_ref = self.get_dataset_ref(dataset_id, project_id=project_id)
+        dataset = self.metadata_cache.get(
+            (project_id, dataset_id, None),
+            lambda: self.client.get_dataset(dataset_ref)
+        )
+        if dataset is None:
+            raise NotFound("Dataset {}:{} not found".format(project_id, dataset_id))
+        return dataset
+
     def delete_dataset(self, dataset_id=bq_default_dataset(),project_id=bq_default_project(),delete_contents=False):
         """ Deletes a BigQuery dataset.
 
@@ -195,6 +806,7 @@ class BigQueryExecutor:
                 dataset_ref,
                 delete_contents=delete_contents
             )
+            self.metadata_cache.invalidate(project_id, dataset_id)
             logging.info(
                 "Dataset %s:%s deleted",
                 project_id,
@@ -222,6 +834,7 @@ class BigQueryExecutor:
         else:
             try:
                 self.client.create_dataset(dataset_ref)
+                self.metadata_cache.created(project_id, dataset_id)
                 logging.info(
                     "Created dataset %s in in project %s",
                     dataset_id,
@@ -242,13 +855,169 @@ class BigQueryExecutor:
         Returns:
             True is the table exists, False otherwise.
         """
-        table_ref = self.get_table_ref(dataset_id, table_id, project_id=project_id)
+        listed = self.metadata_cache.listed(project_id, dataset_id, table_id)
+        if listed is not None:
+            return listed
         try:
-            self.client.get_table(table_ref)
+            self.get_table(table_id, dataset_id=dataset_id, project_id=project_id)
             return True
         except NotFound:
             return False
 
+    def prefetch_datasets(self, project_id=bq_default_project(), ttl=None):
+        """ Lists the datasets of a project in one call, so that dataset_exists answers from the
+        metadata cache for the datasets listed. Datasets not listed are still fetched.
+
+        Parameters:
+            project_id (string): BigQuery project ID.
+            ttl (float): seconds the listing is valid for. Defaults to metadata_ttl.
+
+        Returns:
+            Set of dataset ids.
+        """
+        dataset_ids = {
+            dataset.dataset_id
+            for dataset in self.client.list_datasets(project=project_id, include_all=True)
+        }
+        self.metadata_cache.set_listing(project_id, None, dataset_ids, ttl=ttl)
+        return dataset_ids
+
+    def prefetch_tables(self, dataset_id=bq_default_dataset(), project_id=bq_default_project(),
+                        ttl=None, attributes=False):
+        """ Lists the tables of a dataset in one call, so that table_exists answers from the
+        metadata cache for the tables listed. Tables not listed are still fetched, as they may have
+        been created since, unless the listing is valid until clear_listings (ttl float('inf')).
+        A dataset not found is listed as empty.
+
+        Parameters:
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+            ttl (float): seconds the listing is valid for. Defaults to metadata_ttl.
+            attributes (bool): also reads the attributes of the tables, with their schema, in one
+            INFORMATION_SCHEMA query, so that get_table_attributes and get_table_schema answer from
+            the listing (see list_table_attributes). Defaults to False.
+
+        Returns:
+            Set of table ids.
+        """
+        dataset_ref = self.get_dataset_ref(dataset_id, project_id=project_id)
+        try:
+            tables = list(self.client.list_tables(dataset_ref))
+        except NotFound:
+            tables = []
+        table_attributes = None
+        if attributes and tables:
+            table_attributes = self.list_table_attributes(
+                tables,
+                dataset_id=dataset_id,
+                project_id=project_id
+            )
+        table_ids = {table.table_id for table in tables}
+        self.metadata_cache.set_listing(
+            project_id,
+            dataset_id,
+            table_ids,
+            ttl=ttl,
+            attributes=table_attributes
+        )
+        return table_ids
+
+    def list_table_attributes(self, tables, dataset_id=bq_default_dataset(),
+                              project_id=bq_default_project()):
+        """ Returns the attributes of the tables of a dataset, as get_table_attributes, read from
+        their listing and from a single query on the INFORMATION_SCHEMA of the dataset.
+        Views, external tables and tables partitioned by range are left out.
+
+        Parameters:
+            tables (list): TableListItems of the dataset, as returned by client.list_tables.
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+
+        Returns:
+            dict of attributes by table id.
+        """
+        job = self.client.query(table_attributes_query(project_id, dataset_id), project=project_id)
+        rows = {
+            row['table_name']: row for row in self.wait_for_job(
+                job,
+                task='list_table_attributes',
+                table=f"{project_id}.{dataset_id}"
+            )
+        }
+        result = {}
+        for table in tables:
+            row = rows.get(table.table_id)
+            if table.table_type != 'TABLE' or row is None:
+                continue
+            # _PARTITIONTIME and _PARTITIONDATE are pseudo columns, of ingestion-time partitioning
+            columns = [
+                column for column in row['columns']
+                if not column['column_name'].startswith('_PARTITION')
+            ]
+            time_partitioning = table.time_partitioning
+            partitioned = any(column['is_partitioning_column'] == 'YES' for column in columns)
+            if partitioned and (time_partitioning is None or time_partitioning.field is None):
+                # partitioned by range
+                continue
+            descriptions = {
+                description['field_path']: description['description']
+                for description in row['descriptions'] or []
+            }
+            options = {
+                option['option_name']: option['option_value'] for option in row['options'] or []
+            }
+            kms_key_name = option_literal(options.get('kms_key_name'))
+            result[table.table_id] = {
+                'clustering_fields': table.clustering_fields,
+                'description': option_literal(options.get('description')),
+                'encryption_configuration': (
+                    bigquery.EncryptionConfiguration(kms_key_name=kms_key_name)
+                    if kms_key_name else None
+                ),
+                'expires': table.expires,
+                'external_data_configuration': None,
+                'friendly_name': table.friendly_name,
+                'labels': table.labels,
+                'range_partitioning': None,
+                'require_partition_filter': option_literal(options.get('require_partition_filter')),
+                'schema': [
+                    schema_field_from_type(
+                        column['column_name'],
+                        column['data_type'],
+                        nullable=column['is_nullable'] == 'YES',
+                        descriptions=descriptions
+                    )
+                    for column in columns
+                ],
+                'time_partitioning': time_partitioning
+            }
+        return result
+
+    def get_table(self, table_id, dataset_id=bq_default_dataset(), project_id=bq_default_project()):
+        """ Gets a BigQuery table, from the metadata cache if it was fetched less than metadata_ttl
+        seconds ago. The table returned should not be modified: use client.get_table to patch a
+        table.
+
+        Parameters:
+            table_id (string): BigQuery table ID.
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+
+        Returns:
+            bigquery.Table object
+
+        Raises:
+            NotFound if the table does not exist.
+        """
+        table_ref = self.get_table_ref(dataset_id, table_id, project_id=project_id)
+        table = self.metadata_cache.get(
+            (project_id, dataset_id, table_id),
+            lambda: self.client.get_table(table_ref)
+        )
+        if table is None:
+            raise NotFound("Table {}:{}.{} not found".format(project_id, dataset_id, table_id))
+        return table
+
     def delete_table(self, table_id, dataset_id=bq_default_dataset(),project_id=bq_default_project()):
         """ Delete a BigQuery table.
 
@@ -261,6 +1030,7 @@ class BigQueryExecutor:
         try:
             table_ref = self.get_table_ref(dataset_id, table_id,project_id=project_id)
             self.client.delete_table(table_ref)
+            self.metadata_cache.invalidate(project_id, dataset_id, table_id)
             logging.info(
                 'Table %s:%s.%s deleted.',
                 project_id,
@@ -322,6 +1092,7 @@ class BigQueryExecutor:
             table.clustering_fields = clustering
             try:
                 table = self.client.create_table(table)
+                self.metadata_cache.created(project_id, dataset_id, table_id)
                 logging.info(
                     'Created table %s.%s in in project %s',
                     dataset_id,
@@ -331,6 +1102,74 @@ class BigQueryExecutor:
             except exceptions.Conflict as error:
                 logging.error(error)
 
+    def table_fingerprint(self, sql, schema_path='', **kwargs):
+        """ Hashes what a table built from a SQL query depends on, apart from its upstream tables.
+
+        Parameters:
+            sql (string): the rendered SQL query.
+            schema_path (string): Path to the BigQuery table schema from PROJECT_ROOT.
+            **kwargs: other table settings, e.g. partition, clustering.
+
+        Returns:
+            40 characters hexadecimal string, usable as a label value.
+        """
+        content = json.dumps(kwargs, sort_keys=True, default=str) + sql
+        if schema_path != '':
+            with open(os.path.join(os.getenv("PROJECT_ROOT"), schema_path), 'r') as file:
+                content += file.read()
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def is_table_unchanged(self, table_id, sql, fingerprint, dataset_id=bq_default_dataset(),
+                           project_id=bq_default_project()):
+        """ Checks whether rebuilding a table from a SQL query would leave it unchanged, i.e.:
+        the table was last built with the same fingerprint (pygyver_fingerprint label),
+        the SQL query is deterministic, and every table it references is a table
+        (not a view or an external table) modified before the table.
+
+        Parameters:
+            table_id (string): BigQuery table ID.
+            sql (string): the rendered SQL query.
+            fingerprint (string): as returned by table_fingerprint.
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+
+        Returns:
+            True if the table is unchanged, False otherwise.
+        """
+        functions = '|'.join(non_deterministic_functions())
+        if re.search(r"\b({})\b".format(functions), sql, flags=re.IGNORECASE):
+            return False
+        try:
+            table = self.get_table(table_id, dataset_id=dataset_id, project_id=project_id)
+            if table.labels.get('pygyver_fingerprint') != fingerprint:
+                return False
+            for reference in extract_table_references(sql, keep_project=True):
+                split_reference = reference.split(".")
+                upstream = self.get_table(
+                    split_reference[-1],
+                    dataset_id=split_reference[-2],
+                    project_id=(
+                        split_reference[0] if len(split_reference) == 3 else self.client.project
+                    )
+                )
+                if upstream.table_type != 'TABLE' or upstream.modified >= table.modified:
+                    return False
+        except NotFound:
+            return False
+        return True
+
+    def set_table_fingerprint(self, table_id, fingerprint, dataset_id=bq_default_dataset(),
+                              project_id=bq_default_project()):
+        """ Sets the pygyver_fingerprint label of a table, used by is_table_unchanged. """
+        table = self.client.get_table(
+            self.get_table_ref(dataset_id, table_id, project_id=project_id)
+        )
+        labels = dict(table.labels)
+        labels['pygyver_fingerprint'] = fingerprint
+        table.labels = labels
+        self.client.update_table(table, ["labels"])
+        self.metadata_cache.invalidate(project_id, dataset_id, table_id)
+
     def create_table(self, table_id, dataset_id=bq_default_dataset(),project_id=bq_default_project(), sql=None, file=None,
                      write_disposition='WRITE_TRUNCATE', use_legacy_sql=False,
                      location='US', schema_path='',
@@ -339,8 +1178,29 @@ class BigQueryExecutor:
                      clustering=None,
                      priority='INTERACTIVE',
                      description=None,
+                     skip_unchanged=False,
+                     wait=True,
+                     pk=None,
+                     staged_swap=False,
                      **kwargs):
-        """ create a bigquery table from a sql query """
+        """ create a bigquery table from a sql query
+
+        If skip_unchanged is True and write_disposition is WRITE_TRUNCATE, the table is not rebuilt
+        when neither its SQL, its settings nor its upstream tables changed since it was last built
+        (see is_table_unchanged). Returns None when the table is skipped.
+
+        If wait is False, the QueryJob is returned as soon as it is submitted, whatever the
+        priority. Many jobs can then be waited for at once with wait_for_jobs. The description and
+        the skip_unchanged fingerprint are set when wait_for_jobs, or wait_for_job, sees the job
+        succeed.
+
+        If write_disposition is MERGE, the query result is merged into the table on the primary key
+        pk (see merge_load), and the job is always waited for.
+
+        If staged_swap is True, schema_path is set and write_disposition is WRITE_TRUNCATE, the
+        table is not truncated before the query: the query result replaces it at once, see
+        create_table_staged. The job is then always waited for.
+        """
 
         if sql is None and file is None:
             raise BigQueryExecutorError("Either SQL or file containing the SQL must be provided")
@@ -348,6 +1208,72 @@ class BigQueryExecutor:
         if sql is None:
             sql = read_sql(file, **kwargs)
 
+        if write_disposition == 'MERGE':
+            query_job = self.merge_load(
+                self.create_table,
+                table_id=table_id,
+                pk=pk,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                schema_path=schema_path,
+                sql=sql,
+                use_legacy_sql=use_legacy_sql,
+                location=location,
+                partition=partition,
+                partition_field=partition_field,
+                clustering=clustering,
+                priority=priority
+            )
+            if description:
+                self.update_table_description(table_id=table_id, description=description,
+                                              project_id=project_id, dataset_id=dataset_id)
+            return query_job
+
+        fingerprint = None
+        if skip_unchanged and write_disposition == 'WRITE_TRUNCATE':
+            fingerprint = self.table_fingerprint(
+                sql,
+                schema_path=schema_path,
+                use_legacy_sql=use_legacy_sql,
+                partition=partition,
+                partition_field=partition_field,
+                clustering=clustering
+            )
+            if self.is_table_unchanged(
+                table_id, sql, fingerprint, dataset_id=dataset_id, project_id=project_id
+            ):
+                logging.info(
+                    'Table %s:%s.%s is unchanged, skipping',
+                    project_id,
+                    dataset_id,
+                    table_id
+                )
+                return None
+
+        if (staged_swap and schema_path != '' and write_disposition == 'WRITE_TRUNCATE'
+                and '$' not in table_id):
+            query_job = self.create_table_staged(
+                table_id=table_id,
+                sql=sql,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                schema_path=schema_path,
+                partition=partition,
+                partition_field=partition_field,
+                clustering=clustering,
+                use_legacy_sql=use_legacy_sql,
+                location=location,
+                priority=priority
+            )
+            if fingerprint is not None:
+                self.set_table_fingerprint(
+                    table_id, fingerprint, dataset_id=dataset_id, project_id=project_id
+                )
+            if description:
+                self.update_table_description(table_id=table_id, description=description,
+                                              project_id=project_id, dataset_id=dataset_id)
+            return query_job
+
         if schema_path != '':
             self.initiate_table(
                 table_id=table_id,
@@ -387,14 +1313,41 @@ class BigQueryExecutor:
             location=location,
             job_config=job_config
         )
+        self.metadata_cache.invalidate(project_id, dataset_id, table_id)
+        if not wait:
+            logging.info(
+                'Query job %s submitted for table %s:%s.%s',
+                query_job.job_id,
+                project_id,
+                dataset_id,
+                table_id
+            )
+            if fingerprint is not None:
+                self.add_job_callback(query_job, lambda: self.set_table_fingerprint(
+                    table_id, fingerprint, dataset_id=dataset_id, project_id=project_id
+                ))
+            if description:
+                self.add_job_callback(query_job, lambda: self.update_table_description(
+                    table_id=table_id,
+                    description=description,
+                    project_id=project_id,
+                    dataset_id=dataset_id
+                ))
+            return query_job
         if priority == 'INTERACTIVE':
-            query_job.result()
+            self.wait_for_job(
+                query_job, task='create_partition_table' if '$' in table_id else 'create_table'
+            )
             logging.info(
             'Query results loaded to table %s:%s.%s',
                 project_id,
                 dataset_id,
                 table_id
             )
+            if fingerprint is not None:
+                self.set_table_fingerprint(
+                    table_id, fingerprint, dataset_id=dataset_id, project_id=project_id
+                )
         if description:
             self.update_table_description(table_id=table_id, description=description,
                                           project_id=project_id, dataset_id=dataset_id)
@@ -402,6 +1355,71 @@ class BigQueryExecutor:
         return query_job
 
 
+    def create_table_staged(self, table_id, sql, dataset_id=bq_default_dataset(),
+                            project_id=bq_default_project(), schema_path='', partition=False,
+                            partition_field='_PARTITIONTIME', clustering=None,
+                            priority='INTERACTIVE', **kwargs):
+        """ Creates a table from a SQL query through its staging table: the staging table is
+        initiated with schema_path, the query result is written to it, then it replaces the table
+        with a single
+        copy job. Readers see the previous data of the table until the copy, and no DELETE is
+        billed.
+
+        Parameters:
+            table_id (string): BigQuery table ID.
+            sql (string): SQL query.
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+            schema_path (string): Path to the schema file of the table.
+            partition (bool): Specify whether the table is partitioned. Defaults to False.
+            partition_field (string): partition field if the table is partitioned. Defaults to
+            "_PARTITIONTIME".
+            clustering (list): List of clustering fields. Defaults to None.
+            priority (string): INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+            **kwargs: other arguments of create_table, e.g. location.
+
+        Returns:
+            QueryJob of the query written to the staging table.
+        """
+        staging_id = staging_table_id(table_id)
+        self.initiate_table(
+            table_id=staging_id,
+            schema_path=schema_path,
+            dataset_id=dataset_id,
+            project_id=project_id,
+            partition=partition,
+            partition_field=partition_field,
+            clustering=clustering
+        )
+        try:
+            query_job = self.create_table(
+                table_id=staging_id,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                sql=sql,
+                write_disposition='WRITE_EMPTY',
+                partition=partition,
+                partition_field=partition_field,
+                clustering=clustering,
+                priority=priority,
+                **kwargs
+            )
+            if priority != 'INTERACTIVE':
+                self.wait_for_job(query_job, task='create_table')
+            self.copy_table(
+                source_table_id=staging_id,
+                dest_table_id=table_id,
+                source_dataset_id=dataset_id,
+                dest_dataset_id=dataset_id,
+                source_project_id=project_id,
+                dest_project_id=project_id,
+                write_disposition='WRITE_TRUNCATE'
+            )
+        finally:
+            self.delete_table(staging_id, dataset_id=dataset_id, project_id=project_id)
+        return query_job
+
+
     def create_partition_table(self,
                                table_id,
                                dataset_id=bq_default_dataset(),
@@ -416,11 +1434,21 @@ class BigQueryExecutor:
                                priority="INTERACTIVE",
                                schema_path="",
                                description=None,
+                               backfill_days=None,
+                               max_concurrency=1,
                                **kwargs
                               ):
         """
         Partition to be generated are either passed through partition_dates or automatically generated using existing partitions.
         To filter on a specific partition, the filter DATE(_PARTITIONTIME) = {partition_date} can be used in your sql query.
+
+        If backfill_days is set, consecutive dates are grouped in ranges of at most backfill_days
+        days and each range is written by a single job instead of one job per date (see
+        backfill_partitions).
+
+        If max_concurrency is greater than 1, up to max_concurrency partitions are written at the
+        same time, within the partition modification rate of the table. All the partitions are then
+        attempted before a BigQueryExecutorError listing the failed ones is raised.
         """
         if sql is None and file is None:
             raise BigQueryExecutorError("Either SQL or file containing the SQL must be provided")
@@ -452,41 +1480,218 @@ class BigQueryExecutor:
                 end_date=bq_end_date(),
                 existing_dates=existing_dates
             )
-        else:
-            self.validate_partition_dates(
-                partition_dates=partition_dates
+        else:
+            self.validate_partition_dates(
+                partition_dates=partition_dates
+            )
+            dates = partition_dates
+
+        if backfill_days:
+            self.backfill_partitions(
+                table_id=table_id,
+                sql=sql,
+                dates=dates,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                partition_field=partition_field,
+                write_disposition=write_disposition,
+                use_legacy_sql=use_legacy_sql,
+                priority=priority,
+                backfill_days=backfill_days
+            )
+            dates = []
+
+        rate_limiter = RateLimiter(*partition_modification_rate())
+
+        def create_partition(date):
+            partition_name = self.set_partition_name(table=table_id, date=date)
+            logging.info("Updating partition: %s", partition_name)
+            rate_limiter.wait()
+            return self.create_table(
+                sql=self.apply_partition_filter(
+                    sql=sql,
+                    date=date
+                ),
+                dataset_id=dataset_id,
+                project_id=project_id,
+                table_id=partition_name,
+                write_disposition=write_disposition,
+                use_legacy_sql=use_legacy_sql,
+                partition=True,
+                partition_field=partition_field,
+                clustering=clustering,
+                priority=priority
+            )
+
+        jobs = []
+        if max_concurrency > 1 and len(dates) > 1:
+            failed = {}
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                future_to_date = {executor.submit(create_partition, date): date for date in dates}
+                for future in concurrent.futures.as_completed(future_to_date):
+                    try:
+                        jobs.append(future.result())
+                    except Exception as error:
+                        logging.error("Partition %s failed: %s", future_to_date[future], error)
+                        failed[future_to_date[future]] = error
+            if failed:
+                raise BigQueryExecutorError(
+                    "{} partition(s) of {}:{}.{} failed: {}".format(
+                        len(failed), project_id, dataset_id, table_id, ', '.join(sorted(failed))
+                    )
+                ) from next(iter(failed.values()))
+        else:
+            for date in dates:
+                jobs.append(create_partition(date))
+
+        if priority == 'BATCH':
+            self.wait_for_jobs(jobs, task='create_partition_table')
+
+        if description:
+            self.update_table_description(table_id=table_id, description=description,
+                                          project_id=project_id, dataset_id=dataset_id)
+
+
+    def backfill_partitions(self,
+                            table_id,
+                            sql,
+                            dates,
+                            dataset_id=bq_default_dataset(),
+                            project_id=bq_default_project(),
+                            partition_field='_PARTITIONTIME',
+                            write_disposition='WRITE_TRUNCATE',
+                            use_legacy_sql=False,
+                            priority='INTERACTIVE',
+                            backfill_days=31):
+        """ Writes many partitions of an existing table with one job per range of consecutive dates.
+
+        The SQL is formatted with the first and last dates of each range as {partition_start_date}
+        and {partition_end_date} (format '%Y%m%d'), e.g.
+        DATE(_PARTITIONTIME) BETWEEN PARSE_DATE("%Y%m%d", '{partition_start_date}') AND
+        PARSE_DATE("%Y%m%d", '{partition_end_date}'). It must return the columns of the table, and
+        the partition of each row: the partition_field column, or a partition_date column (DATE or
+        TIMESTAMP) for a table partitioned by ingestion time. Each job is a transaction deleting the
+        partitions of the range (WRITE_TRUNCATE) and inserting the rows of the range. The jobs run
+        one after the other.
+
+        Parameters:
+            table_id (string): BigQuery table ID.
+            sql (string): SQL query.
+            dates (list of string): partition dates with format '%Y%m%d'.
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+            partition_field (string): partition column. Defaults to '_PARTITIONTIME'.
+            write_disposition (string): WRITE_TRUNCATE or WRITE_APPEND.
+            use_legacy_sql (bool): must be False.
+            priority (string): INTERACTIVE or BATCH.
+            backfill_days (int): maximum number of days written by a job. Defaults to 31.
+
+        Returns:
+            List of the jobs.
+
+        Raises:
+            BigQueryExecutorError if the write disposition or legacy SQL are not supported, if the
+            SQL has placeholders other than {partition_start_date} and {partition_end_date}, e.g.
+            the {partition_date} of a query written for one job per date, or if a job fails.
+        """
+        if write_disposition not in ('WRITE_TRUNCATE', 'WRITE_APPEND'):
+            raise BigQueryExecutorError(
+                "Backfill supports WRITE_TRUNCATE and WRITE_APPEND write dispositions only"
+            )
+        if use_legacy_sql:
+            raise BigQueryExecutorError("Backfill does not support legacy SQL")
+        placeholders = {
+            field for _, field, _, _ in string.Formatter().parse(sql) if field is not None
+        }
+        unknown = placeholders - {'partition_start_date', 'partition_end_date'}
+        if unknown:
+            raise BigQueryExecutorError(
+                "Backfill formats the SQL with {{partition_start_date}} and {{partition_end_date}} "
+                "only, found: {}".format(', '.join('{' + field + '}' for field in sorted(unknown)))
             )
-            dates = partition_dates
+
+        schema = self.get_table_schema(
+            table_id=table_id, dataset_id=dataset_id, project_id=project_id
+        )
+        columns = ['`{}`'.format(field.name) for field in schema]
+        if not partition_field or partition_field == '_PARTITIONTIME':
+            partition_expression = "DATE(_PARTITIONTIME)"
+            source_expression = "CAST(partition_date AS DATE)"
+            insert_columns = ['_PARTITIONTIME'] + columns
+            select_columns = ['TIMESTAMP(CAST(partition_date AS DATE))'] + columns
+        else:
+            field_type = {field.name: field.field_type for field in schema}.get(partition_field)
+            partition_expression = (
+                "`{}`" if field_type == 'DATE' else "DATE(`{}`)"
+            ).format(partition_field)
+            source_expression = partition_expression
+            insert_columns = columns
+            select_columns = columns
+
+        job_config = bigquery.QueryJobConfig()
+        job_config.use_legacy_sql = False
+        job_config.priority = set_priority(priority)
 
         jobs = []
-        for date in dates:
-            partition_name = self.set_partition_name(table=table_id, date=date)
-            logging.info("Updating partition: %s", partition_name)
-            job = self.create_table(
-                sql=self.apply_partition_filter(
-                    sql=sql,
-                    date=date
-                ),
-                dataset_id=dataset_id,
-                project_id=project_id,
-                table_id=partition_name,
-                write_disposition=write_disposition,
-                use_legacy_sql=use_legacy_sql,
-                partition=True,
-                partition_field=partition_field,
-                clustering=clustering,
-                priority=priority
+        for start_date, end_date in self.get_partition_ranges(dates, backfill_days):
+            logging.info(
+                "Backfilling partitions %s to %s of %s:%s.%s",
+                start_date, end_date, project_id, dataset_id, table_id
+            )
+            date_filter = (
+                "BETWEEN PARSE_DATE('%Y%m%d', '{}') AND PARSE_DATE('%Y%m%d', '{}')"
+            ).format(start_date, end_date)
+            statements = ["BEGIN TRANSACTION;"]
+            if write_disposition == 'WRITE_TRUNCATE':
+                statements.append(
+                    "DELETE FROM `{}.{}.{}` WHERE {} {};".format(
+                        project_id, dataset_id, table_id, partition_expression, date_filter
+                    )
+                )
+            statements.append(
+                "INSERT INTO `{}.{}.{}` ({}) SELECT {} FROM ({}) WHERE {} {};".format(
+                    project_id, dataset_id, table_id,
+                    ', '.join(insert_columns),
+                    ', '.join(select_columns),
+                    sql.format(partition_start_date=start_date, partition_end_date=end_date),
+                    source_expression,
+                    date_filter
+                )
+            )
+            statements.append("COMMIT TRANSACTION;")
+            job = self.client.query(
+                "\n".join(statements), project=project_id, job_config=job_config
             )
+            self.metadata_cache.invalidate(project_id, dataset_id, table_id)
             jobs.append(job)
+            # transactions on the same table would conflict, the ranges are written one after the
+            # other
+            self.wait_for_job(
+                job, task='create_partition_table', table=f"{project_id}.{dataset_id}.{table_id}"
+            )
+        return jobs
 
-        if priority == 'BATCH':
-            for job in jobs:
-                job.result()
+    def get_partition_ranges(self, dates, max_days):
+        """ Groups partition dates in ranges of consecutive dates.
 
-        if description:
-            self.update_table_description(table_id=table_id, description=description,
-                                          project_id=project_id, dataset_id=dataset_id)
+        Parameters:
+            dates (list of string): partition dates with format '%Y%m%d'.
+            max_days (int): maximum number of days in a range.
 
+        Returns:
+            List of (start_date, end_date) tuples with format '%Y%m%d'.
+        """
+        ranges = []
+        dates = {
+            datetime.datetime.strptime(date.replace("-", ""), '%Y%m%d').date() for date in dates
+        }
+        for date in sorted(dates):
+            if (ranges and (date - ranges[-1][1]).days == 1
+                    and (date - ranges[-1][0]).days < max_days):
+                ranges[-1][1] = date
+            else:
+                ranges.append([date, date])
+        return [(start.strftime('%Y%m%d'), end.strftime('%Y%m%d')) for start, end in ranges]
 
     def apply_partition_filter(self, sql, date):
         """ Apply partition_date to the SQL query.
@@ -549,19 +1754,17 @@ class BigQueryExecutor:
         """
         partition_dates = []
         required_dates = date_lister(start_date=start_date, end_date=end_date)
-        if existing_dates == []:
-            for date in required_dates:
-                partition_date = date.replace("-", "")
+        existing_dates = set(existing_dates)
+        for date in required_dates:
+            partition_date = date.replace("-", "")
+            if partition_date not in existing_dates:
                 partition_dates.append(partition_date)
-        else:
-            for date in required_dates:
-                partition_date = date.replace("-", "")
-                if partition_date not in existing_dates:
-                    partition_dates.append(partition_date)
         return partition_dates
 
     def get_existing_partition_query(self, dataset_id, table_id,project_id = bq_default_project()):
-        """ Gets existing partitions from BigQuery as dataframe.
+        """ Gets the existing partitions from the partition metadata
+        (INFORMATION_SCHEMA.PARTITIONS), without scanning the table. Works for tables partitioned by
+        ingestion time or by column.
 
         Parameters:
             table_id (string): BigQuery table ID.
@@ -569,21 +1772,32 @@ class BigQueryExecutor:
             project_id (string): BigQuery project ID.
 
         Returns:
-            DataFrame of existing partitions
+            Set of the dates (datetime.date) of the partitions containing rows.
         """
         sql = """ SELECT
-                    FORMAT_DATE('%Y%m%d', DATE(_PARTITIONTIME)) AS partition_id
+                    partition_id
                   FROM
-                    `{dataset_id}.{table_id}`
-                  GROUP BY
-                    1 """.format(
+                    `{project_id}.{dataset_id}.INFORMATION_SCHEMA.PARTITIONS`
+                  WHERE
+                    table_name = '{table_id}'
+                    AND total_rows > 0
+                    AND partition_id NOT IN (
+                      '__NULL__', '__UNPARTITIONED__', '__STREAMING_UNPARTITIONED__'
+                    ) """.format(
+                        project_id=project_id,
                         dataset_id=dataset_id,
                         table_id=table_id
                         )
-        return self.execute_sql(
-            sql=sql,
-            project_id=project_id
+        job = self.client.query(sql, project=project_id)
+        rows = self.wait_for_job(
+            job, task='get_existing_partitions', table=f"{project_id}.{dataset_id}.{table_id}"
         )
+        # partition_id is YYYYMMDD for daily partitions, YYYYMMDDHH for hourly partitions
+        return {
+            datetime.datetime.strptime(row['partition_id'][:8], '%Y%m%d').date()
+            for row in rows
+            if len(row['partition_id']) >= 8
+        }
 
     def get_existing_partition_dates(self, table_id, dataset_id=bq_default_dataset(),project_id=bq_default_project()):
         """ Gets existing partitions.
@@ -594,19 +1808,14 @@ class BigQueryExecutor:
             project_id (string): BigQuery project ID.
 
         Returns:
-            List of existing partition dates.
+            Sorted list of existing partition dates with format '%Y%m%d'.
         """
         if not self.table_exists(dataset_id=dataset_id, table_id=table_id,project_id=project_id):
-            existing_partition_dates = []
-        else:
-            res = self.get_existing_partition_query(dataset_id=dataset_id, table_id=table_id)
-            # checks that res has number of rows > 0
-            if res.shape[0] > 0:
-                existing_partition_dates = res['partition_id'].to_list()
-            # if not, no existing partitions
-            else:
-                existing_partition_dates = []
-        return existing_partition_dates
+            return []
+        partitions = self.get_existing_partition_query(
+            dataset_id=dataset_id, table_id=table_id, project_id=project_id
+        )
+        return sorted(date.strftime('%Y%m%d') for date in partitions)
 
     def get_table_schema(self, table_id, dataset_id=bq_default_dataset(), project_id=bq_default_project()):
         """ Gets table schema object
@@ -620,9 +1829,10 @@ class BigQueryExecutor:
         Returns:
             Table schema.
         """
-        table_ref = self.get_table_ref(dataset_id, table_id, project_id=project_id)
-        table_schema = self.client.get_table(table_ref).schema
-        return table_schema
+        listed_attributes = self.metadata_cache.listed_attributes(project_id, dataset_id, table_id)
+        if listed_attributes is not None:
+            return listed_attributes['schema']
+        return self.get_table(table_id, dataset_id=dataset_id, project_id=project_id).schema
 
     def get_table_partitioning_type(self, table_id, dataset_id=bq_default_dataset(), project_id=bq_default_project()):
         """ Gets table partitioning_type
@@ -635,19 +1845,23 @@ class BigQueryExecutor:
         Returns:
             partitioning_type is 'DAY' if the table is partitioned, None otherwise.
         """
-        table_ref = self.get_table_ref(dataset_id, table_id, project_id=project_id)
-        table_properties = self.client.get_table(table_ref)._properties
+        table_properties = self.get_table(
+            table_id, dataset_id=dataset_id, project_id=project_id
+        )._properties
         partitioning_type = table_properties.get('timePartitioning', {}).get('type')
         return partitioning_type
 
     def get_table_attributes(self, table_id, dataset_id=bq_default_dataset(), project_id=bq_default_project()):
+        listed_attributes = self.metadata_cache.listed_attributes(project_id, dataset_id, table_id)
+        if listed_attributes is not None:
+            return listed_attributes
         dict_of_attributes = {}
         attributes = ['clustering_fields', 'description', 'encryption_configuration', 'expires',
         'external_data_configuration', 'friendly_name', 'labels', 'range_partitioning',
         'require_partition_filter', 'schema', 'time_partitioning']
-        table_ref = self.get_table_ref(dataset_id, table_id, project_id=project_id)
+        table = self.get_table(table_id, dataset_id=dataset_id, project_id=project_id)
         for attribute in attributes:
-            my_attribute = getattr(self.client.get_table(table_ref), attribute)
+            my_attribute = getattr(table, attribute)
             dict_of_attributes.update({attribute: my_attribute})
         return dict_of_attributes
 
@@ -663,9 +1877,9 @@ class BigQueryExecutor:
         Returns:
             list of clustering fields is the table has cluster fields, None otherwise.
         """
-        table_ref = self.get_table_ref(dataset_id, table_id, project_id=project_id)
-        clustering_fields = self.client.get_table(table_ref).clustering_fields
-        return clustering_fields
+        return self.get_table(
+            table_id, dataset_id=dataset_id, project_id=project_id
+        ).clustering_fields
 
     def identify_new_fields(self, table_id, schema_path, dataset_id=bq_default_dataset(),project_id=bq_default_project()):
         """ Identify new fields in based on a schema file.
@@ -711,6 +1925,7 @@ class BigQueryExecutor:
 
         table.schema = new_schema
         table = self.client.update_table(table, ["schema"])  # API request
+        self.metadata_cache.invalidate(project_id, dataset_id, table_id)
         assert len(table.schema) == len(original_schema) + 1 == len(new_schema)
         return 0
 
@@ -785,6 +2000,7 @@ class BigQueryExecutor:
             table.schema = new_schema
             try:
                 table = self.client.update_table(table, ["schema"])  # API request
+                self.metadata_cache.invalidate(project_id, dataset_id, table_id)
                 return 0
             except exceptions.BadRequest as error:
                 raise error
@@ -817,20 +2033,177 @@ class BigQueryExecutor:
             try:
                 table.description = description
                 self.client.update_table(table, ["description"])  # API request
+                self.metadata_cache.invalidate(project_id, dataset_id, table_id)
             except exceptions.BadRequest as error:
                 raise error
 
-    def execute_sql(self, sql, project_id=bq_default_project(), dialect='standard'):
+    def get_bqstorage_client(self):
+        """ Returns the BigQuery Storage Read API client of the executor, shared by the process. """
+        if self.bqstorage_client is None:
+            self.bqstorage_client = clients.bigquery_storage_client()
+        return self.bqstorage_client
+
+    def dry_run_sql(self, sql, project_id=bq_default_project(), use_legacy_sql=False,
+                    location='US'):
+        """ Runs a SQL query as a dry-run job, which validates it and estimates its cost without
+        running it.
+
+        Parameters:
+            sql (string): SQL Query.
+            project_id (string): BigQuery Project ID.
+            use_legacy_sql (bool): Defaults to False.
+            location (string): Defaults to 'US'.
+
+        Returns:
+            Number of bytes the query would process.
+        """
+        job_config = bigquery.QueryJobConfig()
+        job_config.dry_run = True
+        job_config.use_query_cache = False
+        job_config.use_legacy_sql = use_legacy_sql
+        job = self.client.query(sql, project=project_id, location=location, job_config=job_config)
+        return job.total_bytes_processed
+
+    def run_query(self, sql, project_id=bq_default_project(), dialect='standard'):
+        """ Runs a SQL query job and waits for it.
+
+        Parameters:
+            sql (string): SQL Query.
+            project_id (string): BigQuery Project ID.
+            dialect (string): BigQuery dialect, standard or legacy. Defaults to standard.
+
+        Returns:
+            QueryJob, done.
+        """
+        job_config = bigquery.QueryJobConfig()
+        job_config.use_legacy_sql = dialect == 'legacy'
+        job = self.client.query(sql, project=project_id, job_config=job_config)
+        self.wait_for_job(job, task='execute_sql')
+        return job
+
+    def query_rows(self, sql, project_id=bq_default_project(), dialect='standard', page_size=None):
+        """ Runs a SQL query job and waits for it.
+
+        Parameters:
+            sql (string): SQL Query.
+            project_id (string): BigQuery Project ID.
+            dialect (string): BigQuery dialect, standard or legacy. Defaults to standard.
+            page_size (int): number of rows per page of the result. Defaults to the API default.
+
+        Returns:
+            RowIterator of the query result.
+        """
+        return self.run_query(
+            sql, project_id=project_id, dialect=dialect
+        ).result(page_size=page_size)
+
+    def read_result_batches(self, job, project_id=bq_default_project()):
+        """ Reads the result of a query job with the BigQuery Storage Read API, one record batch at
+        a time.
+
+        Parameters:
+            job (QueryJob): query job, done.
+            project_id (string): BigQuery Project ID billed for the read.
+
+        Yields:
+            pyarrow.RecordBatch
+        """
+        destination = job.destination
+        client = self.get_bqstorage_client()
+        # DataFormat is in enums with google-cloud-bigquery-storage 1.x, in types with 2.x
+        data_format = getattr(
+            bigquery_storage_v1, 'enums', bigquery_storage_v1.types
+        ).DataFormat.ARROW
+        session = client.create_read_session(
+            parent="projects/{}".format(project_id),
+            read_session=bigquery_storage_v1.types.ReadSession(
+                table="projects/{}/datasets/{}/tables/{}".format(
+                    destination.project,
+                    destination.dataset_id,
+                    destination.table_id
+                ),
+                data_format=data_format
+            ),
+            # a single stream keeps the rows in order and one batch in memory
+            max_stream_count=1
+        )
+        for stream in session.streams:
+            for page in client.read_rows(stream.name).rows(session).pages:
+                yield page.to_arrow()
+
+    def execute_sql_chunks(self, sql, project_id=bq_default_project(), dialect='standard',
+                           chunk_size=100000, use_storage_api=False, as_arrow=False):
+        """ Executes a SQL query and yields the result in chunks, so that results larger than the
+        memory can be processed chunk by chunk.
+
+        Parameters:
+            sql (string): SQL Query.
+            project_id (string): BigQuery Project ID.
+            dialect (string): BigQuery dialect. Defaults to standard.
+            chunk_size (int): maximum number of rows per chunk. Defaults to 100000.
+            use_storage_api (bool): reads the result with the BigQuery Storage Read API as Arrow
+            record batches, re-chunked to chunk_size rows. Defaults to False: one chunk per page of
+            the REST API, which can hold less than chunk_size rows for wide rows.
+            as_arrow (bool): yields pyarrow.Table chunks instead of DataFrames. Defaults to False.
+
+        Yields:
+            DataFrame, or pyarrow.Table if as_arrow, of at most chunk_size rows. Every chunk has the
+            schema of the result, with nullable Int64 and boolean dtypes, whatever NULLs it holds.
+
+        Example:
+            >>> sql = "SELECT * FROM `data.sale_order`"
+            >>> for chunk in db.execute_sql_chunks(sql, chunk_size=50000):
+            ...     process(chunk)
+        """
+        job = self.run_query(sql, project_id=project_id, dialect=dialect)
+        if not use_storage_api:
+            rows = job.result(page_size=chunk_size)
+            schema = arrow_schema(rows.schema)
+            for page in rows.pages:
+                page_rows = list(page)
+                table = pa.Table.from_pydict(
+                    {field.name: [row[field.name] for row in page_rows] for field in rows.schema},
+                    schema=schema
+                )
+                yield table if as_arrow else arrow_to_dataframe(table)
+            return
+
+        batches, buffered = [], 0
+        for batch in self.read_result_batches(job, project_id=project_id):
+            batches.append(batch)
+            buffered += batch.num_rows
+            while buffered >= chunk_size:
+                table = pa.Table.from_batches(batches)
+                chunk = table.slice(0, chunk_size)
+                yield chunk if as_arrow else arrow_to_dataframe(chunk)
+                rest = table.slice(chunk_size)
+                batches, buffered = rest.to_batches(), rest.num_rows
+        if buffered > 0:
+            table = pa.Table.from_batches(batches)
+            yield table if as_arrow else arrow_to_dataframe(table)
+
+    def execute_sql(self, sql, project_id=bq_default_project(), dialect='standard',
+                    use_storage_api=False, as_arrow=False):
         """ Executes a SQL query and loads it as a DataFrame.
 
         Parameters:
             sql (string): SQL Query.
             project_id (string): BigQuery Project ID.
             dialect (string): BigQuery dialect. Defaults to standard.
+            use_storage_api (bool): downloads the result with the BigQuery Storage Read API, as
+            Arrow record batches read from several streams in parallel. Much faster for large
+            results. Defaults to False.
+            as_arrow (bool): returns a pyarrow.Table instead of a DataFrame. Defaults to False.
 
         Returns:
-            Query result as a DataFrame.
+            Query result as a DataFrame, or as a pyarrow.Table if as_arrow.
         """
+        if use_storage_api or as_arrow:
+            table = self.query_rows(sql, project_id=project_id, dialect=dialect).to_arrow(
+                bqstorage_client=self.get_bqstorage_client() if use_storage_api else None
+            )
+            return table if as_arrow else table.to_pandas()
+
         data = pd.read_gbq(
             sql,
             project_id=project_id,
@@ -841,13 +2214,15 @@ class BigQueryExecutor:
         return data
 
     def execute_file(self, file, project_id=bq_default_project(),
-                     dialect='standard', *args, **kwargs):
+                     dialect='standard', *args, use_storage_api=False, as_arrow=False, **kwargs):
         """ Executes a SQL file and loads it as a DataFrame.
 
         Parameters:
             file (string): Path to SQL file.
             project_id (string): BigQuery Project ID.
             dialect (string): BigQuery dialect. Defaults to standard.
+            use_storage_api (bool): see execute_sql.
+            as_arrow (bool): see execute_sql.
 
         **kwargs can be passed if the SQL file contains arguments formatted with {}.
 
@@ -861,11 +2236,15 @@ class BigQueryExecutor:
         data = self.execute_sql(
             sql=sql,
             project_id=project_id,
-            dialect=dialect
+            dialect=dialect,
+            use_storage_api=use_storage_api,
+            as_arrow=as_arrow
         )
         return data
 
-    def load_dataframe(self, df, table_id, dataset_id=bq_default_dataset(),project_id=bq_default_project(), schema_path='', write_disposition="WRITE_TRUNCATE"):
+    def load_dataframe(self, df, table_id, dataset_id=bq_default_dataset(),
+                       project_id=bq_default_project(), schema_path='',
+                       write_disposition="WRITE_TRUNCATE", pk=None):
         """ Loads DataFrame to BigQuery table.
 
         Parameters:
@@ -874,8 +2253,21 @@ class BigQueryExecutor:
             dataset_id (string): BigQuery dataset ID.
             project_id (string): BigQuery project ID.
             schema_path (string): Path to schema file.
-            write_disposition (string): Write disposition. Can be one of WRITE_TRUNCATE, WRITE_APPEND or WRITE_EMPTY.
+            write_disposition (string): Write disposition. Can be one of WRITE_TRUNCATE,
+            WRITE_APPEND, WRITE_EMPTY or MERGE.
+            pk (list): primary key columns, required with MERGE, see merge_load.
         """
+        if write_disposition == 'MERGE':
+            return self.merge_load(
+                self.load_dataframe,
+                table_id=table_id,
+                pk=pk,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                schema_path=schema_path,
+                df=df
+            )
+
         if schema_path != '':
             self.initiate_table(
                 table_id=table_id,
@@ -896,7 +2288,7 @@ class BigQueryExecutor:
             table_ref,
             job_config=job_config
         )
-        job.result()
+        self.wait_for_job(job, task='load_dataframe')
 
 
     def create_gs_table(self,
@@ -953,6 +2345,7 @@ class BigQueryExecutor:
         try:
             self.client.delete_table(gs_table, not_found_ok=True)
             self.client.create_table(gs_table)
+            self.metadata_cache.created(project_id, dataset_id, table_id)
             logging.info(
                 f"Created table {project_id}:{dataset_id}.{table_id} with live connection to {googlesheet_uri}"
             )
@@ -1056,11 +2449,13 @@ class BigQueryExecutor:
                     location='US',
                     job_config=job_config
                 )
-                job.result()
+                self.wait_for_job(job, task='load_json_file')
         else:
             raise Exception("Please initiate %s:%s.%s or pass the schema file",project_id ,dataset_id, table_id)
 
-    def load_json_data(self, json, table_id, dataset_id=bq_default_dataset(),project_id=bq_default_project(), schema_path='', write_disposition="WRITE_TRUNCATE"):
+    def load_json_data(self, json, table_id, dataset_id=bq_default_dataset(),
+                       project_id=bq_default_project(), schema_path='',
+                       write_disposition="WRITE_TRUNCATE", pk=None):
         """ Loads JSON data to BigQuery table.
 
         Parameters:
@@ -1069,8 +2464,21 @@ class BigQueryExecutor:
             dataset_id (string): BigQuery dataset ID.
             project_id (string): BigQuery project ID.
             schema_path (string): Path to schema file.
-            write_disposition (string): Write disposition. Can be one of WRITE_TRUNCATE, WRITE_APPEND or WRITE_EMPTY.
+            write_disposition (string): Write disposition. Can be one of WRITE_TRUNCATE,
+            WRITE_APPEND, WRITE_EMPTY or MERGE.
+            pk (list): primary key columns, required with MERGE, see merge_load.
         """
+        if write_disposition == 'MERGE':
+            return self.merge_load(
+                self.load_json_data,
+                table_id=table_id,
+                pk=pk,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                schema_path=schema_path,
+                json=json
+            )
+
         if schema_path != '':
             self.initiate_table(
                 table_id=table_id,
@@ -1096,24 +2504,45 @@ class BigQueryExecutor:
                 location='US',
                 job_config=job_config
             )
-            job.result()
+            self.wait_for_job(job, task='load_json_data')
         else:
             raise Exception("Please initiate %s:%s.%s or pass the schema file",project_id,dataset_id, table_id)
 
-    def load_gcs(self, dataset_id, table_id, gcs_path, gcs_bucket=gcs_default_bucket(),project_id=bq_default_project(), location='US', schema_path='', header=True, write_disposition='WRITE_TRUNCATE'):
-        """ Loads Google Cloud Storage CSV file into a BigQuery table.
+    def load_gcs(self, dataset_id, table_id, gcs_path, gcs_bucket=gcs_default_bucket(),
+                 project_id=bq_default_project(), location='US', schema_path='', header=True,
+                 write_disposition='WRITE_TRUNCATE', source_format='CSV', pk=None):
+        """ Loads Google Cloud Storage CSV or Parquet files into a BigQuery table.
 
         Parameters:
             table_id (string): BigQuery table ID.
             dataset_id (string): BigQuery dataset ID.
             project_id (string): BigQuery project ID.
             gcs_bucket (string): Google Cloud Storage Bucket.
-            gcs_path (string): Google Cloud Storage Path.
+            gcs_path (string): Google Cloud Storage Path, can contain a * wildcard.
             location (string): Defaults to 'US'.
             schema NBD
             header (bool): Defaults to True.
-            write_disposition (string): Write disposition. Can be one of WRITE_TRUNCATE, WRITE_APPEND or WRITE_EMPTY.
+            write_disposition (string): Write disposition. Can be one of WRITE_TRUNCATE,
+            WRITE_APPEND, WRITE_EMPTY or MERGE.
+            source_format (string): CSV or PARQUET. Defaults to CSV. Parquet files carry their
+            schema.
+            pk (list): primary key columns, required with MERGE, see merge_load.
         """
+        if write_disposition == 'MERGE':
+            return self.merge_load(
+                self.load_gcs,
+                table_id=table_id,
+                pk=pk,
+                dataset_id=dataset_id,
+                project_id=project_id,
+                schema_path=schema_path,
+                gcs_path=gcs_path,
+                gcs_bucket=gcs_bucket,
+                location=location,
+                header=header,
+                source_format=source_format
+            )
+
 
         if isinstance(gcs_path, list):
             uri = ["gs://{}/{}".format(gcs_bucket, p) for p in gcs_path]
@@ -1132,13 +2561,13 @@ class BigQueryExecutor:
                 project_id=project_id
             )
             job_config.schema = read_table_schema_from_file(schema_path)
-            if header:
+            if header and source_format == 'CSV':
                 job_config.skip_leading_rows = 1
-        else:
+        elif source_format == 'CSV':
             job_config.schema = None
             job_config.autodetect = True
 
-        job_config.source_format = bigquery.SourceFormat.CSV
+        job_config.source_format = getattr(bigquery.SourceFormat, source_format)
         job_config.write_disposition = write_disposition
 
         table_ref = self.get_table_ref(
@@ -1154,7 +2583,7 @@ class BigQueryExecutor:
             location=location
         )
 
-        load_job.result()  # Waits for job to complete.
+        self.wait_for_job(load_job, task='load_gcs')
 
         logging.info(
             'Loaded %s to %s:%s.%s',
@@ -1175,6 +2604,15 @@ class BigQueryExecutor:
         source_url=None,
         sql=None,
         file=None,
+        staging_format="csv",
+        chunk_size=100000,
+        partition_column=None,
+        lower_bound=None,
+        upper_bound=None,
+        num_partitions=1,
+        pool=False,
+        watermark_column=None,
+        pk=None,
         **kwargs
     ):
         """ Load data from another db into a BigQuery table
@@ -1188,14 +2626,77 @@ class BigQueryExecutor:
             table_id (str): BigQuery table ID.
             project_id (str): BigQuery project ID.
             schema_path (str): Path to schema file, if not set then BQ will auto-detect when creating a new table.
-            write_disposition (str): Write disposition. Can be one of WRITE_TRUNCATE, WRITE_APPEND or WRITE_EMPTY.
+            write_disposition (str): Write disposition. Can be one of WRITE_TRUNCATE, WRITE_APPEND,
+            WRITE_EMPTY or MERGE.
             source (str): Defines connection using env vars with this prefix, e.g. "ERP", "MAGENTO", etc.
             source_url (str): Defines connection using SQLAlchemy database URL format, e.g.
             sql (str): SQL query (or table name).
             file (str): path to the SQL file relative to PROJECT_ROOT env var.
+            staging_format (str): format of the files staged on GCS, csv or parquet. Defaults to
+            csv. With parquet, the query result is read chunk by chunk, each chunk is uploaded as a
+            Parquet file and the files are loaded in one job, so that the memory stays bounded and
+            the types are preserved.
+            chunk_size (int): number of rows per Parquet file. Defaults to 100000.
+            partition_column (str): numeric column to extract the query result on, in num_partitions
+            ranges between lower_bound and upper_bound, concurrently on separate connections.
+            See DBExecutor.execute_query_chunks. Defaults to None, extracted on a single connection.
+            lower_bound (int or float): lower bound of the ranges of partition_column.
+            upper_bound (int or float): upper bound of the ranges of partition_column.
+            num_partitions (int): number of ranges of partition_column. Defaults to 1.
+            pool (bool): reuses the connection pool of the source shared by the process, see
+            DBExecutor. Defaults to False, a new connection per load.
+            watermark_column (str): loads incrementally: only the rows with watermark_column after
+            its maximum in the BigQuery table are extracted and appended, e.g. updated_at. Defaults
+            to None, a full load. The first load, when the table does not exist, is a full load with
+            write_disposition.
+            pk (list): primary key columns, required if write_disposition is MERGE. With
+            watermark_column, the new rows are merged on the primary key, so that the updated rows
+            replace their previous version. Defaults to None.
             **kwargs: an be applied to pass parameters into SQL file
         """
-        db = DBExecutor(name=source, url=source_url)
+        if partition_column is not None:
+            kwargs.update(
+                partition_column=partition_column,
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+                num_partitions=num_partitions
+            )
+
+        if watermark_column is not None:
+            watermark = self.get_watermark(
+                table_id, watermark_column, dataset_id=dataset_id, project_id=project_id
+            )
+            if watermark is not None:
+                logging.info(
+                    'Loading %s.%s from %s > %s', dataset_id, table_id, watermark_column, watermark
+                )
+                if sql is None:
+                    sql = read_sql_file(file, **kwargs)
+                    file = None
+                # rows updated at the watermark itself are reloaded when they are merged on the
+                # primary key
+                sql = incremental_query(sql, watermark_column, watermark, inclusive=bool(pk))
+                write_disposition = "MERGE" if pk else "WRITE_APPEND"
+
+        if staging_format == "parquet":
+            self.load_from_db_parquet(
+                dataset_id=dataset_id,
+                table_id=table_id,
+                project_id=project_id,
+                schema_path=schema_path,
+                write_disposition=write_disposition,
+                source=source,
+                source_url=source_url,
+                sql=sql,
+                file=file,
+                chunk_size=chunk_size,
+                pool=pool,
+                pk=pk,
+                **kwargs
+            )
+            return
+
+        db = DBExecutor(name=source, url=source_url, pool=pool)
         df = db.execute_query(sql=sql, file=file, **kwargs)
         db.clean_up()
 
@@ -1218,11 +2719,219 @@ class BigQueryExecutor:
             schema_path=schema_path,
             gcs_path=gcs_path,
             header=True,
-            write_disposition=write_disposition
+            write_disposition=write_disposition,
+            pk=pk
         )
 
         gcs.delete_directory(gcs_directory="temp_load_from_db")
 
+    def load_from_db_parquet(
+        self,
+        dataset_id,
+        table_id,
+        project_id=bq_default_project(),
+        schema_path="",
+        write_disposition="WRITE_TRUNCATE",
+        source=None,
+        source_url=None,
+        sql=None,
+        file=None,
+        chunk_size=100000,
+        pool=False,
+        pk=None,
+        **kwargs
+    ):
+        """ Load data from another db into a BigQuery table through Parquet files staged on GCS,
+        one file per chunk of the query result, loaded with a single wildcard load job.
+
+        All the files are written with the same schema, so that the load job reads them as one:
+        the schema of schema_path, else of the table if it exists with the columns of the result,
+        else of the first chunk. An empty result is written as an empty file if the schema is known
+        (e.g. truncating the table with WRITE_TRUNCATE), and nothing is loaded otherwise.
+
+        Args:
+            see load_from_db.
+        """
+        gcs = GCSExecutor()
+        gcs_directory = f"temp_load_from_db/{dataset_id}/{table_id}/"
+        gcs.delete_directory(gcs_directory=gcs_directory)
+
+        schema, table_schema = None, None
+        if schema_path:
+            schema = arrow_schema(read_table_schema_from_file(schema_path))
+        elif self.table_exists(table_id, dataset_id=dataset_id, project_id=project_id):
+            table_schema = arrow_schema(
+                self.get_table_schema(table_id, dataset_id=dataset_id, project_id=project_id)
+            )
+
+        db = DBExecutor(name=source, url=source_url, pool=pool)
+        files = 0
+        # each chunk is uploaded while the next one is extracted, so at most two chunks are in
+        # memory
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            upload = None
+            try:
+                chunks = db.execute_query_chunks(
+                    sql=sql, file=file, chunk_size=chunk_size, **kwargs
+                )
+                for number, df in enumerate(chunks):
+                    if schema is None:
+                        if table_schema is not None and table_schema.names == list(df.columns):
+                            schema = table_schema
+                        else:
+                            schema = dataframe_arrow_schema(df)
+                    if upload is not None:
+                        upload.result()
+                    upload = executor.submit(
+                        gcs.df_to_gcs_parquet,
+                        gcs_path=f"{gcs_directory}{number:06d}.parquet",
+                        df=df,
+                        schema=schema
+                    )
+                    files += 1
+                if upload is not None:
+                    upload.result()
+            finally:
+                db.clean_up()
+
+        if files == 0:
+            schema = schema or table_schema
+            if schema is None:
+                logging.warning(
+                    "No rows to load into %s.%s, and no schema to create it with",
+                    dataset_id, table_id
+                )
+                return
+            gcs.df_to_gcs_parquet(
+                gcs_path=f"{gcs_directory}{0:06d}.parquet",
+                df=schema.empty_table().to_pandas(),
+                schema=schema
+            )
+
+        try:
+            self.load_gcs(
+                project_id=project_id,
+                dataset_id=dataset_id,
+                table_id=table_id,
+                schema_path=schema_path,
+                gcs_path=f"{gcs_directory}*.parquet",
+                write_disposition=write_disposition,
+                source_format="PARQUET",
+                pk=pk
+            )
+        finally:
+            gcs.delete_directory(gcs_directory=gcs_directory)
+
+
+    def get_watermark(self, table_id, column, dataset_id=bq_default_dataset(),
+                      project_id=bq_default_project()):
+        """ Returns the maximum of a column of a table, e.g. the last updated_at loaded.
+
+        Parameters:
+            table_id (string): BigQuery table ID.
+            column (string): watermark column.
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+
+        Returns:
+            The maximum of the column, None if the table does not exist or is empty.
+        """
+        if not self.table_exists(table_id, dataset_id=dataset_id, project_id=project_id):
+            return None
+        rows = self.query_rows(
+            f"SELECT MAX({column}) AS watermark FROM `{project_id}.{dataset_id}.{table_id}`",
+            project_id=project_id
+        )
+        return list(rows)[0]['watermark']
+
+    def merge_table(self, table_id, source_table_id, pk, dataset_id=bq_default_dataset(),
+                    project_id=bq_default_project(), source_dataset_id=None):
+        """ Merges a source table into a table with a single MERGE statement: the rows matching a
+        source row on the primary key are updated, the other source rows are inserted.
+
+        Parameters:
+            table_id (string): BigQuery table ID merged into.
+            source_table_id (string): BigQuery table ID merged from, with the same columns.
+            pk (list): primary key columns, e.g. ['order_id'].
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+            source_dataset_id (string): BigQuery dataset ID of the source table. Defaults to
+            dataset_id.
+
+        The source columns whose type differs from the table, e.g. autodetected by a load, are cast
+        to the type of the table.
+        """
+        if not pk:
+            raise BigQueryExecutorError(
+                f"A primary key is required to merge into {dataset_id}.{table_id}"
+            )
+        source_dataset_id = source_dataset_id or dataset_id
+        source_schema = self.get_table_schema(
+            source_table_id, dataset_id=source_dataset_id, project_id=project_id
+        )
+        columns = [field.name for field in source_schema]
+        casts = merge_casts(
+            self.get_table_schema(table_id, dataset_id=dataset_id, project_id=project_id),
+            source_schema
+        )
+        table = f"{project_id}.{dataset_id}.{table_id}"
+        sql = merge_statement(
+            table, f"{project_id}.{source_dataset_id}.{source_table_id}", columns, pk, casts
+        )
+        job = self.client.query(sql, project=project_id)
+        self.wait_for_job(job, task='merge_table', table=table)
+        self.metadata_cache.invalidate(project_id, dataset_id, table_id)
+        logging.info(
+            'Merged %s.%s into %s on %s', source_dataset_id, source_table_id, table, ', '.join(pk)
+        )
+
+    def merge_load(self, load, table_id, pk, dataset_id=bq_default_dataset(),
+                   project_id=bq_default_project(), schema_path='', **kwargs):
+        """ Runs a load method in MERGE mode: the data is written to the staging table of the table
+        with WRITE_TRUNCATE, then merged into the table on the primary key with a single MERGE
+        statement, so that only the matched and new rows are rewritten. If the table does not exist
+        yet, the data is written to the table directly.
+
+        WRITE_TRUNCATE replaces the schema of the staging table with the schema of the load, e.g.
+        autodetected: merge_table casts the staging columns to the types of the table.
+
+        Parameters:
+            load (method): load method, e.g. self.load_dataframe.
+            table_id (string): BigQuery table ID.
+            pk (list): primary key columns, e.g. ['order_id'].
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+            schema_path (string): Path to schema file. Defaults to the schema of the table.
+            **kwargs: other arguments of load, e.g. df.
+
+        Returns:
+            The result of load.
+        """
+        if not pk:
+            raise BigQueryExecutorError(
+                f"MERGE into {dataset_id}.{table_id} requires a primary key (pk)"
+            )
+        if not self.table_exists(table_id, dataset_id=dataset_id, project_id=project_id):
+            return load(table_id=table_id, dataset_id=dataset_id, project_id=project_id,
+                        schema_path=schema_path, write_disposition='WRITE_TRUNCATE', **kwargs)
+
+        staging_id = staging_table_id(table_id)
+        if schema_path == '':
+            self.copy_table_structure(
+                source_table_id=table_id,
+                dest_table_id=staging_id,
+                source_dataset_id=dataset_id,
+                dest_dataset_id=dataset_id,
+                source_project_id=project_id,
+                dest_project_id=project_id
+            )
+        try:
+            result = load(table_id=staging_id, dataset_id=dataset_id, project_id=project_id,
+                          schema_path=schema_path, write_disposition='WRITE_TRUNCATE', **kwargs)
+            self.merge_table(table_id, staging_id, pk, dataset_id=dataset_id, project_id=project_id)
+        finally:
+            self.delete_table(staging_id, dataset_id=dataset_id, project_id=project_id)
+        return result
 
     def insert_rows_json(self, dataset_id, table_id, rows,project_id=bq_default_project()):
         """ Insert rows into a table via the streaming API.
@@ -1249,6 +2958,7 @@ class BigQueryExecutor:
                 rows,
                 ignore_unknown_values=True
             )
+            self.metadata_cache.invalidate(project_id, dataset_id, table_id)
             if error_response == []:
                 logging.info(
                     'Loaded %s row(s) into %s:%s.%s',
@@ -1297,7 +3007,9 @@ class BigQueryExecutor:
             location=location
         )
 
-        job.result()  # Waits for job to complete.
+        self.wait_for_job(
+            job, task='extract_table_to_gcs', table=f"{project_id}.{dataset_id}.{table_id}"
+        )
 
         logging.info(
             'Table %s:%s.%s loaded to %s',
@@ -1317,6 +3029,7 @@ class BigQueryExecutor:
         """
         query=f"DELETE FROM `{project_id}.{dataset_id}.{table_id}` WHERE TRUE"
         self.execute_sql(sql=query, project_id=project_id)
+        self.metadata_cache.invalidate(project_id, dataset_id, table_id)
         logging.info(
             'Table %s:%s.%s has been truncated',
             project_id,
@@ -1356,12 +3069,97 @@ class BigQueryExecutor:
                     setattr(table, attribute_key, attribute_value)
 
             self.client.create_table(table) # Make an API request.
+            self.metadata_cache.created(dest_project_id, dest_dataset_id, dest_table_id)
             logging.info(
                 "Created table {}.{}.{}".format(table.project, table.dataset_id, table.table_id)
             )
 
 
 
+    def clone_table(
+        self,
+        source_table_id,
+        dest_table_id,
+        source_dataset_id=bq_default_dataset(),
+        dest_dataset_id=bq_default_dataset(),
+        source_project_id=bq_default_project(),
+        dest_project_id=bq_default_project(),
+        recent_days=None
+    ):
+        """ Clones a BigQuery table with CREATE TABLE ... CLONE: the clone has the data of the
+        source table but is billed for storage only once it diverges from it, and is created
+        without copying data.
+
+        Parameters:
+            source_table_id (string): Source BigQuery table ID.
+            dest_table_id (string): Destination BigQuery table ID. Replaced if it exists.
+            source_dataset_id (string): Source BigQuery Dataset ID.
+            dest_dataset_id (string): Destination BigQuery Dataset ID.
+            source_project_id (string): Source BigQuery Project ID.
+            dest_project_id (string): Destination BigQuery Project ID.
+            recent_days (int): only the partitions of the last recent_days days are kept. A clone
+            cannot be filtered, so the table structure is copied and the recent partitions are
+            inserted into it with a query, billed for the bytes of these partitions. Ignored for
+            tables not partitioned by time. Defaults to None: the whole table is cloned.
+
+        Only tables can be cloned: the structure of views and external tables is copied with
+        copy_table_structure instead, which skips source tables that do not exist.
+        """
+        source = f"{source_project_id}.{source_dataset_id}.{source_table_id}"
+        dest = f"{dest_project_id}.{dest_dataset_id}.{dest_table_id}"
+        table = None
+        if self.table_exists(
+            source_table_id, dataset_id=source_dataset_id, project_id=source_project_id
+        ):
+            table = self.get_table(
+                source_table_id, dataset_id=source_dataset_id, project_id=source_project_id
+            )
+        if table is None or table.table_type != 'TABLE':
+            logging.info('%s is not a table that can be cloned: copying its structure', source)
+            self.copy_table_structure(
+                source_table_id=source_table_id,
+                dest_table_id=dest_table_id,
+                source_dataset_id=source_dataset_id,
+                dest_dataset_id=dest_dataset_id,
+                source_project_id=source_project_id,
+                dest_project_id=dest_project_id
+            )
+            return
+        time_partitioning = table.time_partitioning if recent_days is not None else None
+
+        if time_partitioning is None:
+            sql = f"CREATE OR REPLACE TABLE `{dest}` CLONE `{source}`"
+        else:
+            self.copy_table_structure(
+                source_table_id=source_table_id,
+                dest_table_id=dest_table_id,
+                source_dataset_id=source_dataset_id,
+                dest_dataset_id=dest_dataset_id,
+                source_project_id=source_project_id,
+                dest_project_id=dest_project_id
+            )
+            since = f"DATE_SUB(CURRENT_DATE(), INTERVAL {int(recent_days)} DAY)"
+            if time_partitioning.field is None:
+                schema = self.get_table_schema(
+                    source_table_id, dataset_id=source_dataset_id, project_id=source_project_id
+                )
+                columns = ", ".join(f"`{field.name}`" for field in schema)
+                sql = (
+                    f"INSERT INTO `{dest}` (_PARTITIONTIME, {columns}) "
+                    f"SELECT _PARTITIONTIME, {columns} FROM `{source}` "
+                    f"WHERE _PARTITIONTIME >= TIMESTAMP({since})"
+                )
+            else:
+                sql = (
+                    f"INSERT INTO `{dest}` SELECT * FROM `{source}` "
+                    f"WHERE DATE(`{time_partitioning.field}`) >= {since}"
+                )
+
+        job = self.client.query(sql, project=dest_project_id)
+        self.wait_for_job(job, task='clone_table', table=dest)
+        self.metadata_cache.invalidate(dest_project_id, dest_dataset_id, dest_table_id)
+        logging.info('Table %s cloned to %s', source, dest)
+
     def copy_table(self, source_table_id, dest_table_id,
                    source_dataset_id=bq_default_dataset(), dest_dataset_id=bq_default_dataset(),
                    source_project_id=bq_default_project(),dest_project_id = bq_default_project(), write_disposition='WRITE_TRUNCATE'):
@@ -1398,7 +3196,7 @@ class BigQueryExecutor:
             project=source_project_id,
             job_config=job_config
         )
-        job.result()
+        self.wait_for_job(job, task='copy_table')
         logging.info(
             'Table %s:%s.%s copied to %s:%s.%s',
             source_project_id,
@@ -1459,11 +3257,11 @@ class BigQueryExecutor:
             table_id (string): BigQuery table ID.
 
         Returns:
-            Number of rows in a BigQuery table.
+            Number of rows in a BigQuery table, read live rather than from the metadata cache.
         """
-        table_ref = self.get_table_ref(dataset_id, table_id,project_id = project_id)
-        table = self.client.get_table(table_ref)
-        return table.num_rows
+        return self.client.get_table(
+            self.get_table_ref(dataset_id, table_id, project_id=project_id)
+        ).num_rows
 
     def count_columns(self, table_id, dataset_id=bq_default_dataset(),project_id=bq_default_project()):
         """ Count columns in table
@@ -1474,11 +3272,11 @@ class BigQueryExecutor:
             table_id (string): BigQuery table ID.
 
         Returns:
-            Number of columns in a BigQuery table.
+            Number of columns in a BigQuery table, read live rather than from the metadata cache.
         """
-        table_ref = self.get_table_ref(dataset_id, table_id,project_id = project_id)
-        table = self.client.get_table(table_ref)
-        return len(table.schema)
+        return len(self.client.get_table(
+            self.get_table_ref(dataset_id, table_id, project_id=project_id)
+        ).schema)
 
     def count_duplicates(self, table_id, primary_key: list, dataset_id=bq_default_dataset(),project_id=bq_default_project()):
         """ Count duplicate rows in primary key
@@ -1495,7 +3293,7 @@ class BigQueryExecutor:
         if not primary_key:
             logging.warning("No primary key supplied, skipping duplicates count.")
             return 0
-        data = self.execute_sql(
+        job = self.client.query(
             f"""
             SELECT
                 COALESCE(SUM(dup_count), 0) AS dup_total
@@ -1509,9 +3307,12 @@ class BigQueryExecutor:
                     {', '.join(primary_key)}
             )
             """,
-            project_id = project_id
+            project=project_id
         )
-        return data['dup_total'].values[0]
+        rows = self.wait_for_job(
+            job, task='count_duplicates', table=f"{project_id}.{dataset_id}.{table_id}"
+        )
+        return list(rows)[0]['dup_total']
 
     def assert_unique(self, table_id, primary_key: list, dataset_id=bq_default_dataset(),project_id=bq_default_project(), ignore_error=False, **kwargs):
         """ Assert uniqueness of primary key in table
@@ -1540,6 +3341,58 @@ class BigQueryExecutor:
             else:
                 raise AssertionError(msg)
 
+    def assert_checks(self, table_id, checks=None, primary_key=None,
+                      dataset_id=bq_default_dataset(), project_id=bq_default_project(),
+                      previous_row_count=None, ignore_error=False, **kwargs):
+        """ Runs the data quality checks of a table, all fused into a single query scanning the
+        table once.
+
+        Parameters:
+            table_id (string): BigQuery table ID.
+            checks (dict): checks by type: unique, not_null, accepted_values, row_count, freshness
+            and relationships. See pygyver.etl.checks.build_checks.
+            primary_key: a list of one or more column names the table should be unique on, e.g.
+            ['col1', 'col2'].
+            dataset_id (string): BigQuery dataset ID.
+            project_id (string): BigQuery project ID.
+            previous_row_count (int): number of rows before the table was created, for row_count
+            max_delta. ignore_error: boolean flag to prevent error being raised, useful for
+            debugging
+
+        Returns:
+            list of dicts with keys 'table', 'check', 'column', 'value' and 'passed', one per check
+            Raise AssertionError listing the failed checks if any and ignore_error=False (default)
+            Log a warning if any check failed and ignore_error=True (debugging)
+        """
+        table = f"{project_id}.{dataset_id}.{table_id}"
+        table_checks = build_checks(
+            checks, primary_key=primary_key, previous_row_count=previous_row_count
+        )
+        if not table_checks:
+            logging.warning("No checks supplied for %s, skipping checks.", table)
+            return []
+        job = self.client.query(check_query(table, table_checks), project=project_id)
+        rows = self.wait_for_job(job, task='assert_checks', table=table)
+        results = check_results(table, table_checks, list(rows)[0])
+        failed = [result for result in results if not result['passed']]
+        if failed:
+            msg = "Table %s:%s.%s failed checks: %s" % (
+                project_id,
+                dataset_id,
+                table_id,
+                ', '.join(
+                    f"{result['check']}({result['column'] or ''})={result['value']}"
+                    for result in failed
+                )
+            )
+            if ignore_error:
+                logging.warning(msg)
+            else:
+                error = AssertionError(msg)
+                error.results = results
+                raise error
+        return results
+
     def assert_acceptance(self, sql, cte, output_table_name='expected_output', **kwargs):
         try:
             sql_extract_output_table = "WITH {} ( SELECT * FROM `{}` )".format(cte, output_table_name)
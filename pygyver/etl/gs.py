@@ -1,10 +1,8 @@
 """ Google Spreadsheet utility """
-import gspread
 import json
 import pandas as pd
-from google.auth.transport.requests import AuthorizedSession
-from google.oauth2 import service_account
 from gspread_dataframe import get_as_dataframe
+from pygyver.etl import clients
 from pygyver.etl import lib
 from pygyver.etl.toolkit import (
     create_folder,
@@ -14,19 +12,9 @@ from pygyver.etl.toolkit import (
 
 
 def gspread_client():
-    """ Sets BigQuery client.
+    """ Returns the Google Spreadsheet client, shared by the process.
     """
-    lib.bq_token_file_valid()
-    credentials = service_account.Credentials.from_service_account_file(
-        lib.bq_token_file_path(),
-        scopes=[
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-    )
-    gc = gspread.Client(auth=credentials)
-    gc.session = AuthorizedSession(credentials)
-    return gc
+    return clients.gspread_client()
 
 
 def load_gs_to_dataframe(key, sheet_name='', sheet_index=0, **kwargs):
@@ -212,6 +212,25 @@ def add_dataset_prefix(obj, dataset_prefix: str, kwargs={}):
                     obj[k] = dataset_prefix + obj[k]
 
 
+def extract_table_references(sql, keep_project=False):
+    """
+    Returns the set of tables referenced between backticks in a SQL query.
+
+    Arguments:
+        - sql: SQL query
+        - keep_project: if True, project ids are kept when present in the reference
+
+    Returns:
+        set of 'dataset_id.table_id' (or 'project_id.dataset_id.table_id') strings
+    """
+    references = set()
+    for index, table in enumerate(sql.split("`")):
+        if index % 2 == 1 and "." in table:
+            split_table = table.split(".")
+            references.add('.'.join(split_table if keep_project else split_table[-2:]))
+    return references
+
+
 def get_dataset_prefix():
     """
     Call this method from a release script listed in pipeline.yaml
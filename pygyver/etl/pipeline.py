@@ -3,7 +3,12 @@ from __future__ import print_function
 
 import os
 import copy
+import json
+import hashlib
+import inspect
 import logging
+import functools
+import threading
 import concurrent.futures
 import numpy as np
 import string
@@ -15,13 +20,218 @@ from pygyver.etl.dw import read_sql
 from pygyver.etl.lib import apply_kwargs
 from pygyver.etl.lib import extract_args
 from pygyver.etl.dw import BigQueryExecutor
+from pygyver.etl.audit import BigQueryAuditLog
 from pygyver.etl.toolkit import read_yaml_file
 from pygyver.etl.lib import bq_default_project
+from pygyver.etl.lib import bq_default_dataset
 from pygyver.etl.lib import bq_default_prod_project
+from pygyver.etl.lib import bq_start_date
+from pygyver.etl.lib import bq_end_date
 from pygyver.etl.lib import add_dataset_prefix
+from pygyver.etl.lib import extract_table_references
 
 
-def execute_parallel(func, args, message='running task', log=''):
+class PipelineExecutorError(Exception):
+    pass
+
+
+def concurrency_operations():
+    """ Operation types which concurrency can be limited in PipelineExecutor """
+    return ['query', 'metadata', 'load']
+
+
+def on_demand_price_per_tib():
+    """ BigQuery on-demand query price, in USD per TiB processed """
+    return 6.25
+
+
+def limit_concurrency(func, limit=None):
+    """
+    wraps func so that the number of concurrent calls is bounded by limit
+
+    Arguments:
+    func (function): function as an object
+    limit (threading.Semaphore): semaphore acquired for the duration of each call. No limit if None.
+    """
+    if limit is None:
+        return func
+
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        with limit:
+            return func(*args, **kwargs)
+    return inner
+
+
+def stop_on_event(func, stop):
+    """
+    wraps func so that it is not called once stop is set
+
+    Arguments:
+    func (function): function as an object
+    stop (threading.Event): event set when the remaining calls should be cancelled
+    """
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        if stop.is_set():
+            raise concurrent.futures.CancelledError()
+        return func(*args, **kwargs)
+    return inner
+
+
+class ExecutionReport:
+    """ Outcome of a parallel execution.
+
+    Attributes:
+        succeeded (list): args of the tasks completed.
+        failed (list): (args, exception) of the tasks failed.
+        cancelled (list): args of the tasks cancelled, or interrupted by the cancellation, after a
+        failure.
+    """
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.cancelled = []
+
+    def __repr__(self):
+        return "ExecutionReport(succeeded=%d, failed=%d, cancelled=%d)" % (
+            len(self.succeeded),
+            len(self.failed),
+            len(self.cancelled)
+        )
+
+    def raise_for_failure(self, message='running task', log=''):
+        """ Raises the first failure, chained to the original exception, with the report attached.
+
+        Raises:
+            AssertionError if the first task failed on an assertion, PipelineExecutorError
+            otherwise.
+        """
+        if not self.failed:
+            return
+        arg, exc = self.failed[0]
+        if isinstance(exc, AssertionError):
+            error = AssertionError(f"{message} {arg.get(log, '')}: failed")
+        else:
+            error = PipelineExecutorError(
+                f"{message} {arg.get(log, '')} generated an exception: {exc}"
+            )
+        error.report = self
+        raise error from exc
+
+
+class CostEstimate:
+    """ Bytes the table tasks of a pipeline would process, estimated with dry-run query jobs.
+
+    Parameters:
+        price_per_tib (float): price in USD per TiB processed. Defaults to
+        on_demand_price_per_tib().
+
+    Attributes:
+        records (list): one dict per table task, with the batch number, task, table, number of
+        partitions, bytes (None if the dry run failed) and error.
+    """
+    def __init__(self, price_per_tib=None):
+        self.price_per_tib = on_demand_price_per_tib() if price_per_tib is None else price_per_tib
+        self.lock = threading.Lock()
+        self.records = []
+
+    def __repr__(self):
+        return "CostEstimate(tables=%d, total_bytes=%d, cost=%.2f, errors=%d)" % (
+            len(self.records),
+            self.total_bytes,
+            self.cost(),
+            len(self.errors)
+        )
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    @property
+    def total_bytes(self):
+        return sum(record['bytes'] or 0 for record in self.records)
+
+    @property
+    def errors(self):
+        """ Records of the tasks which dry run failed, e.g. reading a table created earlier in the
+        pipeline.
+        """
+        return [record for record in self.records if record['error'] is not None]
+
+    def by_batch(self):
+        """ Returns the bytes processed per batch number. """
+        totals = {}
+        for record in self.records:
+            totals[record['batch']] = totals.get(record['batch'], 0) + (record['bytes'] or 0)
+        return dict(sorted(totals.items()))
+
+    def cost(self, total_bytes=None):
+        """ Returns the cost in USD of total_bytes processed. Defaults to the total of the
+        pipeline.
+        """
+        total_bytes = self.total_bytes if total_bytes is None else total_bytes
+        return total_bytes / 2 ** 40 * self.price_per_tib
+
+    def check_budget(self, max_bytes):
+        """ Raises PipelineExecutorError if the pipeline would process more than max_bytes, or if
+        the bytes of some tables could not be estimated: total_bytes is then only a lower bound.
+        """
+        if self.errors:
+            raise PipelineExecutorError(
+                "The budget of {} bytes cannot be checked: "
+                "the bytes of {} table(s) could not be estimated: {}".format(
+                    max_bytes,
+                    len(self.errors),
+                    ', '.join(f"{record['table']} ({record['error']})" for record in self.errors)
+                )
+            )
+        if self.total_bytes > max_bytes:
+            largest = sorted(
+                self.records, key=lambda record: record['bytes'] or 0, reverse=True
+            )[:5]
+            raise PipelineExecutorError(
+                "The pipeline would process {} bytes ({:.2f} USD), "
+                "more than the budget of {} bytes. Largest tables: {}".format(
+                    self.total_bytes,
+                    self.cost(),
+                    max_bytes,
+                    ', '.join(f"{record['table']} ({record['bytes']})" for record in largest)
+                )
+            )
+
+
+def collect_result(future, arg, report, stop, message='running task', log=''):
+    """
+    adds the outcome of a future to the report and logs it
+
+    Returns:
+    the outcome: 'succeeded', 'failed' or 'cancelled'
+    """
+    try:
+        future.result()
+    except concurrent.futures.CancelledError:
+        report.cancelled.append(arg)
+        logging.info(f"{message} {arg.get(log,'')}: cancelled")
+        return 'cancelled'
+    except Exception as exc:
+        if stop.is_set():
+            report.cancelled.append(arg)
+            logging.info(f"{message} {arg.get(log,'')}: interrupted ({exc})")
+            return 'cancelled'
+        report.failed.append((arg, exc))
+        if isinstance(exc, AssertionError):
+            logging.info(f"{message} {arg.get(log,'')}: failed")
+        else:
+            logging.info('%r generated an exception: %s' % (arg, exc))
+        return 'failed'
+    report.succeeded.append(arg)
+    logging.info(f"{message} {arg.get(log,'')}")
+    return 'succeeded'
+
+
+def execute_parallel(func, args, message='running task', log='', executor=None, limit=None,
+                     fail_fast=False, cancel=None):
     """
     execute the functions in parallel for each list of parameters passed in args
 
@@ -29,21 +239,41 @@ def execute_parallel(func, args, message='running task', log=''):
     func (function): function as an object
     args (list): args associated to the function
     message (string): message to be displayed
+    executor (ThreadPoolExecutor): pool the functions are submitted to. Defaults to a new pool of 10
+    workers.
+    limit (threading.Semaphore): bounds the number of concurrent calls to func
+    fail_fast (bool): on the first failure, cancel the tasks not started yet and call cancel
+    cancel (function): called without arguments on the first failure if fail_fast,
+    e.g. BigQueryExecutor.cancel_running_jobs
+
+    Returns:
+    ExecutionReport
+
+    Raises:
+    AssertionError or PipelineExecutorError for the first failure, once all the tasks are completed
+    or cancelled. The report is available as the report attribute of the error.
     """
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_func = {executor.submit(func, **arg): arg for arg in args}
-        for future in concurrent.futures.as_completed(future_to_func):
-            arg = future_to_func[future]
-            try:
-                ret = future.result()
-            except AssertionError:
-                logging.info(f"{message} {arg.get(log,'')}: failed")
-                raise AssertionError
-            except Exception as exc:
-                logging.info('%r generated an exception: %s' % (arg, exc))
-                raise Exception
-            else:
-                logging.info(f"{message} {arg.get(log,'')}")
+    if executor is None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            return execute_parallel(func, args, message=message, log=log, executor=executor,
+                                    limit=limit, fail_fast=fail_fast, cancel=cancel)
+
+    report = ExecutionReport()
+    stop = threading.Event()
+    task = limit_concurrency(stop_on_event(func, stop), limit)
+    future_to_func = {executor.submit(task, **arg): arg for arg in args}
+    for future in concurrent.futures.as_completed(future_to_func):
+        outcome = collect_result(
+            future, future_to_func[future], report, stop, message=message, log=log
+        )
+        if outcome == 'failed' and fail_fast and not stop.is_set():
+            stop.set()
+            for other in future_to_func:
+                other.cancel()
+            if cancel is not None:
+                cancel()
+    report.raise_for_failure(message=message, log=log)
+    return report
 
 
 def extract_unit_test_value(unit_test_list):
@@ -90,17 +320,313 @@ def extract_unit_tests(batch_list=None, kwargs={}):
     return args
 
 
+def build_dependency_graph(tasks):
+    """ Builds the dependency graph of a list of pipeline tasks.
+
+    A task depends on every earlier task writing to the same table and on every task
+    writing to a table it references. References to tables not created by the pipeline are ignored.
+
+    Arguments:
+    tasks (list): dicts with keys 'name' (dataset_id.table_id written) and 'references' (set of
+    tables read)
+
+    Returns:
+    list of sets, the indices of the upstream tasks of each task
+
+    Raises:
+    PipelineExecutorError if the graph contains a cycle
+    """
+    writers = {}
+    for index, task in enumerate(tasks):
+        writers.setdefault(task['name'], []).append(index)
+
+    upstream = []
+    for index, task in enumerate(tasks):
+        deps = {i for i in writers[task['name']] if i < index}
+        for reference in task.get('references', set()):
+            if reference != task['name']:
+                deps.update(writers.get(reference, []))
+        upstream.append(deps)
+
+    remaining = {index: set(deps) for index, deps in enumerate(upstream)}
+    while remaining:
+        ready = [index for index, deps in remaining.items() if not deps]
+        if not ready:
+            cycle = sorted(tasks[index]['name'] for index in remaining)
+            raise PipelineExecutorError(f"Circular dependency between tables: {', '.join(cycle)}")
+        for index in ready:
+            del remaining[index]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return upstream
+
+
+def execute_dag(tasks, upstream, executor=None, fail_fast=False, cancel=None):
+    """
+    execute the tasks in parallel, starting each task as soon as its upstream tasks are completed.
+    Tasks downstream of a failure are never started.
+
+    Arguments:
+    tasks (list): dicts with keys 'name', 'func' (function as an object), 'args' (args associated to
+    the function) and optionally 'limit' (threading.Semaphore bounding the concurrent calls of this
+    kind of task)
+    upstream (list): sets of upstream task indices, as returned by build_dependency_graph
+    executor (ThreadPoolExecutor): pool the tasks are submitted to. Defaults to a new pool of 10
+    workers.
+    fail_fast (bool): on the first failure, do not start new tasks and call cancel
+    cancel (function): called without arguments on the first failure if fail_fast
+
+    Returns:
+    ExecutionReport, with the task names as args
+
+    Raises:
+    AssertionError or PipelineExecutorError for the first failure, once the running tasks are
+    completed.
+    """
+    if executor is None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            return execute_dag(
+                tasks, upstream, executor=executor, fail_fast=fail_fast, cancel=cancel
+            )
+
+    report = ExecutionReport()
+    stop = threading.Event()
+    pending = {index: set(deps) for index, deps in enumerate(upstream)}
+    running = {}
+    while running or (pending and not stop.is_set()):
+        if not stop.is_set():
+            for index in [i for i, deps in pending.items() if not deps]:
+                del pending[index]
+                func = limit_concurrency(
+                    stop_on_event(tasks[index]['func'], stop), tasks[index].get('limit')
+                )
+                running[executor.submit(func, **tasks[index]['args'])] = index
+        if not running:
+            break
+        done, _ = concurrent.futures.wait(
+            running,
+            return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            index = running.pop(future)
+            outcome = collect_result(
+                future,
+                {"name": tasks[index]['name']},
+                report,
+                stop,
+                message=tasks[index]['message'],
+                log='name'
+            )
+            if outcome == 'failed' and fail_fast and not stop.is_set():
+                stop.set()
+                for other in running:
+                    other.cancel()
+                if cancel is not None:
+                    cancel()
+            # tasks downstream of a failed or cancelled task stay pending and are reported as
+            # cancelled
+            if outcome == 'succeeded':
+                for deps in pending.values():
+                    deps.discard(index)
+    for index in pending:
+        report.cancelled.append({"name": tasks[index]['name']})
+    report.raise_for_failure(message='Task', log='name')
+    return report
+
+
 class PipelineExecutor:
-    def __init__(self, yaml_file, dry_run=False, *args, **kwargs):
+    """ Executes the pipeline described in a YAML file.
+
+    Parameters:
+        yaml_file (string): path to the YAML file from PROJECT_ROOT.
+        dry_run (bool): if True, datasets are prefixed with a random dataset_prefix.
+        concurrency (dict): size of the worker pool shared by the pipeline ('max_workers') and
+        maximum number of concurrent calls per operation type ('query', 'metadata', 'load').
+        Overrides the 'concurrency' key of the YAML file. Defaults to 10 workers, no limit per
+        operation.
+        fail_fast (bool): on the first failure of a parallel task, cancel the queued tasks and the
+        running BigQuery query jobs. Defaults to False: all the tasks complete before the error is
+        raised.
+        run_state (LocalRunState or BigQueryRunState): records the tasks completed. Defaults to
+        None: nothing is recorded.
+        run_id (string): identifies the run in run_state. Defaults to the YAML file name and today's
+        date.
+        resume (bool): skips the tasks completed in the same run with the same SQL and arguments.
+        Requires run_state and run_id, so that a run resumed on another day is still recognised.
+        audit_table (string): BigQuery table, as table_id or dataset_id.table_id, to which the
+        statistics of each job are streamed with the run_id. Created if it does not exist. Defaults
+        to None: the statistics are only available in summary.
+        metadata_ttl (int): seconds the table and dataset metadata are cached for by the
+        BigQueryExecutor of the pipeline. Defaults to 60. 0 disables the cache.
+        **kwargs: applied to the YAML values starting with $.
+
+    Attributes:
+        check_results (list): results of the data quality checks of the run, one dict per check.
+    """
+    def __init__(self, yaml_file, dry_run=False, *args, concurrency=None, fail_fast=False,
+                 run_state=None, run_id=None, resume=False, audit_table=None, metadata_ttl=60,
+                 **kwargs):
         self.kwargs = kwargs
+        self.fail_fast = fail_fast
+        if resume and run_state is None:
+            raise PipelineExecutorError("resume requires a run_state")
+        if resume and run_id is None:
+            raise PipelineExecutorError("resume requires the run_id of the run to resume")
+        self.run_state = run_state
+        self.run_id = run_id or f"{PurePath(yaml_file).stem}_{date.today().strftime('%Y%m%d')}"
+        self.resume = resume
         self.yaml = read_yaml_file(yaml_file)
         self.dataset_prefix = None
         if dry_run:
             self.dataset_prefix = f'{randint(1, 99999999):08}_'
             add_dataset_prefix(obj=self.yaml, dataset_prefix=self.dataset_prefix, kwargs=self.kwargs)
-        self.bq = BigQueryExecutor()
+        self.bq = BigQueryExecutor(metadata_ttl=metadata_ttl)
         self.prod_project_id = bq_default_prod_project()
+        self.check_results = []
+        self.check_results_lock = threading.Lock()
+        self.set_concurrency(concurrency)
+        if audit_table is not None:
+            self.set_audit_table(audit_table)
+
+    @property
+    def summary(self):
+        """ RunSummary of the BigQuery jobs run by the pipeline,
+        e.g. summary.top_tables(by='total_slot_ms')
+        """
+        return self.bq.summary
+
+    def set_audit_table(self, audit_table):
+        """ Streams the statistics of each job of the run to audit_table
+        (table_id or dataset_id.table_id).
+        """
+        dataset_id, _, table_id = audit_table.rpartition('.')
+        self.bq.summary.audit_log = BigQueryAuditLog(
+            self.bq,
+            table_id=table_id,
+            dataset_id=dataset_id or bq_default_dataset(),
+            run_id=self.run_id
+        )
+
+    def set_concurrency(self, concurrency=None):
+        """ Sets the size of the worker pool shared by all the parallel executions of the pipeline,
+        and the semaphores limiting the concurrent calls per operation type.
+
+        Parameters:
+            concurrency (dict): e.g. {'max_workers': 50, 'query': 50, 'metadata': 20, 'load': 10}.
+            Keys not set are read from the 'concurrency' key of the YAML file.
+        """
+        settings = dict(self.yaml.get('concurrency', None) or {})
+        settings.update(concurrency or {})
+        unknown = set(settings) - {'max_workers'} - set(concurrency_operations())
+        if unknown:
+            raise KeyError("{} is not a valid concurrency key".format(', '.join(sorted(unknown))))
+        self.max_workers = int(settings.get('max_workers', 10))
+        self._executor = None
+        self.executor_lock = threading.Lock()
+        self.limits = {
+            operation: (
+                threading.BoundedSemaphore(int(settings[operation]))
+                if settings.get(operation) else None
+            )
+            for operation in concurrency_operations()
+        }
+
+    @property
+    def executor(self):
+        """ Worker pool of the pipeline, created on first use and until shutdown. """
+        with self.executor_lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers
+                )
+            return self._executor
+
+    def shutdown(self):
+        """ Shuts down the worker pool of the pipeline. A new pool is created if the pipeline runs
+        parallel tasks again.
+        """
+        with self.executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def run_parallel(self, func, args, operation, message='running task', log=''):
+        """ Executes func in parallel for each item of args on the pipeline worker pool.
+
+        Parameters:
+            func (function): function as an object.
+            args (list): args associated to the function.
+            operation (string): operation type limiting the concurrency, one of
+            concurrency_operations().
+            message (string): message to be displayed.
+            log (string): key of args displayed with the message.
+
+        Returns:
+            ExecutionReport
+        """
+        return execute_parallel(
+            func,
+            args,
+            message=message,
+            log=log,
+            executor=self.executor,
+            limit=self.limits[operation],
+            fail_fast=self.fail_fast,
+            cancel=self.bq.cancel_running_jobs
+        )
+
 
+    def prefetch_metadata(self, datasets, attributes=False):
+        """ Lists the tables of each dataset in parallel, one call per dataset, so that the
+        existence checks of the run are answered from the metadata cache. The listings are valid
+        until the end of the run (clear_listings), whatever its duration.
+
+        Parameters:
+            datasets (iterable): (project_id, dataset_id) tuples.
+            attributes (bool): also reads the attributes and schemas of the tables, one query per
+            dataset (see BigQueryExecutor.prefetch_tables). Defaults to False.
+        """
+        args = [
+            {
+                "project_id": project_id,
+                "dataset_id": dataset_id,
+                "ttl": float('inf'),
+                "attributes": attributes
+            }
+            for project_id, dataset_id in sorted(set(datasets))
+        ]
+        if args != []:
+            self.run_parallel(
+                self.bq.prefetch_tables,
+                args,
+                operation='metadata',
+                message='list tables of: ',
+                log='dataset_id'
+            )
+
+    def batch_datasets(self, batch_list=None):
+        """ Returns the (project_id, dataset_id) of the tables and sheets of the batches. """
+        batch_list = batch_list or self.yaml.get('batches', '')
+        datasets = set()
+        for batch in batch_list:
+            apply_kwargs(batch, self.kwargs)
+            for content in batch.get('tables', []) + batch.get('sheets', []):
+                for task in ['create_table', 'create_partition_table', 'load_google_sheet',
+                             'create_gs_table']:
+                    args = content.get(task, '')
+                    if args != '':
+                        apply_kwargs(args, self.kwargs)
+                        datasets.add((
+                            args.get('project_id', bq_default_project()),
+                            args.get('dataset_id', bq_default_dataset())
+                        ))
+        return datasets
 
     def remove_dataset(self, dataset_id):
         if self.bq.dataset_exists(dataset_id):
@@ -134,24 +660,183 @@ class PipelineExecutor:
                 args_dataset = [dict(t) for t in {tuple(d.items()) for d in args_dataset}]
 
                 if args_dataset != []:
-                    execute_parallel(
+                    self.bq.prefetch_datasets()
+                    self.run_parallel(
                         self.remove_dataset,
                         args_dataset,
+                        operation='metadata',
                         message='delete dataset: ',
                         log='dataset_id'
                     )
 
+    def render_task_sql(self, func, args):
+        """ Returns the SQL of a table task, rendered as func would render it. """
+        if args.get('sql') is not None:
+            return args['sql']
+        params = inspect.signature(func).parameters
+        sql_kwargs = {k: v for k, v in args.items() if k not in params}
+        return read_sql(args['file'], **sql_kwargs)
+
+    def task_fingerprint(self, task, func, args):
+        """ Identifies a task and hashes what it depends on: its arguments, and its rendered SQL
+        for table tasks or the file content for releases. The previous_row_count of checks is
+        measured at run time, so it is left out: checks completed in the run are skipped on resume.
+
+        Returns:
+            (name, fingerprint) tuple
+        """
+        if task == 'release':
+            name = args['python_file']
+            with open(PurePath(os.getenv("PROJECT_ROOT")) / name, 'r') as file:
+                content = file.read()
+        else:
+            name = f"{args.get('dataset_id', bq_default_dataset())}.{args.get('table_id', '')}"
+            if task == 'assert_checks':
+                args = {key: value for key, value in args.items() if key != 'previous_row_count'}
+            content = json.dumps(args, sort_keys=True, default=str)
+            if task in ('create_table', 'create_partition_table'):
+                content += self.render_task_sql(func, args)
+        return name, hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def estimate_cost(self, max_bytes=None, price_per_tib=None, batch_list=None):
+        """ Runs the SQL of every create_table and create_partition_table task as a dry-run query
+        job, in parallel, and estimates the bytes each table would process. Nothing is created.
+
+        Partition tables are estimated as the bytes of their last partition times the number of
+        partitions that would be created. Tasks reading tables created earlier in the pipeline may
+        fail to dry run: they are reported in errors.
+
+        Parameters:
+            max_bytes (int): budget of bytes processed. Defaults to the 'max_bytes' key of the YAML
+            file, or no budget.
+            price_per_tib (float): price in USD per TiB processed. Defaults to
+            on_demand_price_per_tib().
+            batch_list (list): batches to estimate. Defaults to the batches of the YAML file.
+
+        Returns:
+            CostEstimate
+
+        Raises:
+            PipelineExecutorError if the total bytes exceed max_bytes, or if max_bytes is set and
+            some tasks failed to dry run.
+        """
+        batch_list = batch_list or self.yaml.get('batches', '')
+        if max_bytes is None:
+            max_bytes = self.yaml.get('max_bytes', None)
+        estimate = CostEstimate(price_per_tib=price_per_tib)
+        args = []
+        for number, batch in enumerate(batch_list):
+            apply_kwargs(batch, self.kwargs)
+            for to_extract, func in (('create_table', self.bq.create_table),
+                                     ('create_partition_table', self.bq.create_partition_table)):
+                for task_args in extract_args(
+                    batch.get('tables', []), to_extract, kwargs=self.kwargs
+                ):
+                    apply_kwargs(task_args, self.kwargs)
+                    args.append({
+                        "estimate": estimate,
+                        "batch": number,
+                        "task": to_extract,
+                        "func": func,
+                        "args": dict(task_args, dataset_prefix=self.dataset_prefix),
+                        "table": "{}.{}".format(
+                            task_args.get('dataset_id', bq_default_dataset()),
+                            task_args.get('table_id', '')
+                        )
+                    })
+        self.run_parallel(
+            self.estimate_task, args, operation='query', message='Estimated bytes of:', log='table'
+        )
+        for record in estimate.errors:
+            logging.warning(f"Failed to estimate the bytes of {record['table']}: {record['error']}")
+        logging.info(estimate)
+        if max_bytes is not None:
+            estimate.check_budget(int(max_bytes))
+        return estimate
+
+    def estimate_task(self, estimate, batch, task, func, args, table):
+        """ Dry runs the SQL of a table task and adds its record to estimate. Failures are recorded,
+        not raised.
+        """
+        record = {
+            "batch": batch, "task": task, "table": table, "partitions": 1, "bytes": None,
+            "error": None
+        }
+        try:
+            sql = self.render_task_sql(func, args)
+            if task == 'create_partition_table':
+                dates = self.estimate_partition_dates(args)
+                record['partitions'] = len(dates)
+                sql = self.bq.apply_partition_filter(sql, dates[-1]) if dates else None
+            record['bytes'] = 0
+            if sql is not None:
+                record['bytes'] = record['partitions'] * self.bq.dry_run_sql(
+                    sql,
+                    use_legacy_sql=args.get('use_legacy_sql', False),
+                    location=args.get('location', 'US')
+                )
+        except Exception as error:
+            record['error'] = str(error)
+        estimate.add(record)
+
+    def estimate_partition_dates(self, args):
+        """ Returns the partition dates a create_partition_table task would create. """
+        if args.get('partition_dates'):
+            return list(args['partition_dates'])
+        dataset_id = args.get('dataset_id', bq_default_dataset())
+        project_id = args.get('project_id', bq_default_project())
+        existing_dates = []
+        if self.bq.table_exists(args['table_id'], dataset_id=dataset_id, project_id=project_id):
+            existing_dates = self.bq.get_existing_partition_dates(
+                args['table_id'],
+                dataset_id=dataset_id,
+                project_id=project_id
+            )
+        return self.bq.get_partition_dates(
+            start_date=bq_start_date(),
+            end_date=bq_end_date(),
+            existing_dates=existing_dates
+        )
+
+    def run_checkpointed(self, task, func, **kwargs):
+        """ Calls func(**kwargs) and records its completion in run_state.
+
+        With resume, the call is skipped if the task completed in the same run with the same
+        fingerprint.
+
+        Parameters:
+            task (string): task type, e.g. create_table, assert_unique, release.
+            func (function): function as an object.
+        """
+        if self.run_state is None:
+            return func(**kwargs)
+        name, fingerprint = self.task_fingerprint(task, func, kwargs)
+        if self.resume and self.run_state.is_completed(self.run_id, task, name, fingerprint):
+            logging.info(f"Skipping {task} {name}: already completed in run {self.run_id}")
+            return None
+        result = func(**kwargs)
+        self.run_state.record(self.run_id, task, name, fingerprint)
+        return result
+
+    def checkpointed(self, task, func):
+        """ Returns func wrapped by run_checkpointed. """
+        return functools.partial(self.run_checkpointed, task, func)
+
     def create_tables(self, batch):
         args = []
         batch_content = batch.get('tables', '')
         args = extract_args(content=batch_content, to_extract='create_table', kwargs=self.kwargs)
-        for a in args:
+        args_pk = [x.get('pk', []) for x in batch_content if x.get('create_table', '') != '']
+        for a, b in zip(args, args_pk):
             apply_kwargs(a, self.kwargs)
             a.update({"dataset_prefix": self.dataset_prefix})
+            if a.get('write_disposition') == 'MERGE':
+                a.setdefault('pk', b)
         if args != []:
-            execute_parallel(
-                self.bq.create_table,
+            self.run_parallel(
+                self.checkpointed('create_table', self.bq.create_table),
                 args,
+                operation='query',
                 message='Creating table:',
                 log='table_id'
             )
@@ -162,9 +847,10 @@ class PipelineExecutor:
         args = extract_args(content=batch_content, to_extract='create_gs_table', kwargs=self.kwargs)
         if args == []:
             raise Exception("create_gs_table in YAML file is not well defined")
-        execute_parallel(
-                self.bq.create_gs_table,
+        self.run_parallel(
+                self.checkpointed('create_gs_table', self.bq.create_gs_table),
                 args,
+                operation='load',
                 message='Creating live Google Sheet connection table in BigQuery:',
                 log='table_id'
             )
@@ -182,9 +868,10 @@ class PipelineExecutor:
             apply_kwargs(a, self.kwargs)
             a.update({"dataset_prefix": self.dataset_prefix})
         if args != []:
-            execute_parallel(
-                self.bq.create_partition_table,
+            self.run_parallel(
+                self.checkpointed('create_partition_table', self.bq.create_partition_table),
                 args,
+                operation='query',
                 message='Creating partition table:',
                 log='table_id'
             )
@@ -195,28 +882,69 @@ class PipelineExecutor:
         args = extract_args(batch_content, 'load_google_sheet')
         if args == []:
             raise Exception("load_google_sheet in yaml is not well defined")
-        execute_parallel(
-            self.bq.load_google_sheet,
+        self.run_parallel(
+            self.checkpointed('load_google_sheet', self.bq.load_google_sheet),
             args,
+            operation='load',
             message='Loading table:',
             log='table_id'
         )
 
-    def run_checks(self, batch):
-        args, args_pk = [], []
-        batch_content = batch.get('tables', '')
-        args = extract_args(batch_content, 'create_table')
-        args_pk = [x.get('pk', []) for x in batch_content]
-        for a, b in zip(args, args_pk):
-            a.update({
-                "dataset_prefix": self.dataset_prefix,
-                "primary_key": b
-                }
-            )
-        execute_parallel(
-            self.bq.assert_unique,
+    def previous_row_count(self, content):
+        """ Returns the number of rows of the table of a create_table content before it is created,
+        if its checks compare the row count to it (row_count max_delta) and the table exists.
+        """
+        row_count = content.get('checks', {}).get('row_count') or {}
+        args = content.get('create_table', '')
+        if row_count.get('max_delta') is None or args == '':
+            return None
+        table_id = args['table_id']
+        dataset_id = args.get('dataset_id', bq_default_dataset())
+        project_id = args.get('project_id', bq_default_project())
+        if not self.bq.table_exists(table_id, dataset_id=dataset_id, project_id=project_id):
+            return None
+        return self.bq.get_table(table_id, dataset_id=dataset_id, project_id=project_id).num_rows
+
+    def assert_checks(self, **kwargs):
+        """ Runs the checks of a table with BigQueryExecutor.assert_checks and adds their results
+        to check_results.
+        """
+        results = []
+        try:
+            results = self.bq.assert_checks(**kwargs)
+        except AssertionError as error:
+            results = getattr(error, 'results', [])
+            raise
+        finally:
+            with self.check_results_lock:
+                self.check_results.extend(results)
+        return results
+
+    def run_checks(self, batch, row_counts=None):
+        """ Runs the checks of the create_table tables of a batch in parallel: uniqueness on pk and
+        the checks declared under checks, fused into one query per table.
+
+        Parameters:
+            batch (dict): batch of the YAML file.
+            row_counts (list): number of rows of each table before the batch, as returned by
+            previous_row_count.
+        """
+        args = []
+        batch_content = [x for x in batch.get('tables', '') if x.get('create_table', '') != '']
+        row_counts = row_counts or [None] * len(batch_content)
+        for content, row_count in zip(batch_content, row_counts):
+            args.append(dict(
+                content['create_table'],
+                dataset_prefix=self.dataset_prefix,
+                primary_key=content.get('pk', []),
+                checks=content.get('checks', {}),
+                previous_row_count=row_count
+            ))
+        self.run_parallel(
+            self.checkpointed('assert_checks', self.assert_checks),
             args,
-            message='Run pk_check on:',
+            operation='query',
+            message='Run checks on:',
             log='table_id'
         )
 
@@ -225,8 +953,12 @@ class PipelineExecutor:
 
         if 'tables' in batch:
             if extract_args(batch['tables'], 'create_table'):
+                row_counts = [
+                    self.previous_row_count(x) for x in batch['tables']
+                    if x.get('create_table', '') != ''
+                ]
                 self.create_tables(batch)
-                self.run_checks(batch)
+                self.run_checks(batch, row_counts)
             if extract_args(batch['tables'], 'create_partition_table'):
                 self.create_partition_tables(batch)
 
@@ -237,11 +969,104 @@ class PipelineExecutor:
                 self.create_gs_tables(batch)
 
 
-    def run_batches(self):
-        batch_list = self.yaml.get('batches', '')
+    def run_batches(self, dag=False):
+        """ Executes the batches in YAML order, or as a dependency graph if dag is True. """
+        self.prefetch_metadata(self.batch_datasets())
+        try:
+            if dag:
+                self.run_dag()
+                return
+            batch_list = self.yaml.get('batches', '')
+            for batch in batch_list:
+                apply_kwargs(batch, self.kwargs)
+                self.run_batch(batch)
+        finally:
+            self.bq.metadata_cache.clear_listings()
+
+    def create_table_and_check(self, primary_key=None, checks=None, previous_row_count=None,
+                               **kwargs):
+        """ Creates a table then runs its checks, as run_batch does. """
+        if kwargs.get('write_disposition') == 'MERGE':
+            kwargs.setdefault('pk', primary_key)
+        self.run_checkpointed('create_table', self.bq.create_table, **kwargs)
+        self.run_checkpointed(
+            'assert_checks',
+            self.assert_checks,
+            primary_key=primary_key or [],
+            checks=checks or {},
+            previous_row_count=previous_row_count,
+            **kwargs
+        )
+
+    def extract_tasks(self, batch_list=None):
+        """ Flattens the batches into tasks, with the tables each task writes and reads.
+
+        Returns:
+        list of dicts with keys 'name', 'references', 'func', 'args', 'message' and 'limit'
+        """
+        batch_list = batch_list or self.yaml.get('batches', '')
+        task_types = [
+            ('tables', 'create_table', self.bq.create_table, 'Creating table:', 'query'),
+            ('tables', 'create_partition_table', self.bq.create_partition_table,
+             'Creating partition table:', 'query'),
+            ('sheets', 'load_google_sheet', self.bq.load_google_sheet, 'Loading table:', 'load'),
+            ('sheets', 'create_gs_table', self.bq.create_gs_table,
+             'Creating live Google Sheet connection table in BigQuery:', 'load')
+        ]
+        tasks = []
         for batch in batch_list:
             apply_kwargs(batch, self.kwargs)
-            self.run_batch(batch)
+            for source, to_extract, func, message, operation in task_types:
+                for content in batch.get(source, []):
+                    args = content.get(to_extract, '')
+                    if args == '':
+                        continue
+                    apply_kwargs(args, self.kwargs)
+                    references = set()
+                    if source == 'tables':
+                        args.update({"dataset_prefix": self.dataset_prefix})
+                        references = self.extract_task_references(func, args)
+                    task = {
+                        "name": "{}.{}".format(
+                            args.get('dataset_id', bq_default_dataset()), args.get('table_id', '')
+                        ),
+                        "references": references,
+                        "func": self.checkpointed(to_extract, func),
+                        "args": args,
+                        "message": message,
+                        "limit": self.limits[operation]
+                    }
+                    if to_extract == 'create_table':
+                        task['func'] = self.create_table_and_check
+                        task['args'] = dict(
+                            args,
+                            primary_key=content.get('pk', []),
+                            checks=content.get('checks', {}),
+                            previous_row_count=self.previous_row_count(content)
+                        )
+                    tasks.append(task)
+        return tasks
+
+    def extract_task_references(self, func, args):
+        """ Reads the SQL of a table task as func would, and returns the tables it references. """
+        return extract_table_references(self.render_task_sql(func, args))
+
+    def run_dag(self, batch_list=None):
+        """ Executes the batches as a dependency graph.
+
+        Batches are not barriers: each table is created as soon as the tables its SQL reads
+        (backtick references) are created. Tables read but not created by the pipeline are
+        considered available.
+        """
+        tasks = self.extract_tasks(batch_list)
+        upstream = build_dependency_graph(tasks)
+        return execute_dag(
+            tasks,
+            upstream,
+            executor=self.executor,
+            fail_fast=self.fail_fast,
+            cancel=self.bq.cancel_running_jobs
+        )
 
     def run_python_file(self, python_file):
         # _dataset_prefix string is unused in run_python_file()
@@ -262,25 +1087,42 @@ class PipelineExecutor:
             if str(release.get('date', '')) == release_date:
                 logging.info(f"Release {release_date}: {release.get('description', '')}")
                 for python_file in release.get('python_files', []):
-                    self.run_python_file(python_file)
+                    self.run_checkpointed('release', self.run_python_file, python_file=python_file)
 
-    def run(self):
-        self.run_releases()
-        self.run_batches()
+    def run(self, dag=False):
+        try:
+            self.run_releases()
+            self.run_batches(dag=dag)
+        finally:
+            self.shutdown()
+        logging.info(self.summary)
 
     def run_unit_tests(self, batch_list=None):
         batch_list = batch_list or self.yaml.get('batches', '')
         list_unit_test = extract_unit_tests(batch_list, self.kwargs)
         args = extract_unit_test_value(list_unit_test)
         if args != []:
-            execute_parallel(
+            self.run_parallel(
                 self.bq.assert_acceptance,
                 args,
+                operation='query',
                 message='Asserting sql',
                 log='file'
             )
 
-    def copy_prod_structure(self, table_list=''):
+    def copy_prod_structure(self, table_list='', clone=False, recent_days=None):
+        """ Creates the tables of table_list in the dry run datasets, with the structure of the
+        production tables.
+
+        Parameters:
+            table_list (list): tables as dataset.table or project.dataset.table. Defaults to the
+            table_list of the YAML file.
+            clone (bool): clones the production tables instead, with their data, without copying it
+            (see BigQueryExecutor.clone_table), so that the dry run reads realistic inputs. Defaults
+            to False.
+            recent_days (int): with clone, only the partitions of the last recent_days days are
+            kept. Defaults to None.
+        """
         args, args_dataset, datasets = [], [], []
 
         if table_list == '':
@@ -320,21 +1162,48 @@ class PipelineExecutor:
                 _dict
             )
 
-        if args_dataset != []:
-            execute_parallel(
-                self.bq.create_dataset,
-                args_dataset,
-                message='create dataset for: ',
-                log='dataset_id'
-            )
+        try:
+            if args != []:
+                self.bq.prefetch_datasets(ttl=float('inf'))
+                self.prefetch_metadata(
+                    [(bq_default_project(), _dict['dest_dataset_id']) for _dict in args]
+                )
+                self.prefetch_metadata(
+                    [(_dict['source_project_id'], _dict['source_dataset_id']) for _dict in args],
+                    attributes=not clone
+                )
 
-        if args != []:
-            execute_parallel(
-                self.bq.copy_table_structure,
-                args,
-                message='copy table structure for: ',
-                log='source_table_id'
-            )
+            if args_dataset != []:
+                self.run_parallel(
+                    self.bq.create_dataset,
+                    args_dataset,
+                    operation='metadata',
+                    message='create dataset for: ',
+                    log='dataset_id'
+                )
+
+            if args != [] and clone:
+                for _dict in args:
+                    _dict.update(
+                        {"dest_project_id": bq_default_project(), "recent_days": recent_days}
+                    )
+                self.run_parallel(
+                    self.bq.clone_table,
+                    args,
+                    operation='query',
+                    message='clone table for: ',
+                    log='source_table_id'
+                )
+            elif args != []:
+                self.run_parallel(
+                    self.bq.copy_table_structure,
+                    args,
+                    operation='metadata',
+                    message='copy table structure for: ',
+                    log='source_table_id'
+                )
+        finally:
+            self.bq.metadata_cache.clear_listings()
 
     def run_test(self):
         self.run_unit_tests()
@@ -0,0 +1,150 @@
+""" Module to record the tasks completed by a pipeline run, used to resume interrupted runs """
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from google.cloud import bigquery
+from pygyver.etl.lib import bq_default_dataset
+from pygyver.etl.lib import bq_default_project
+
+
+class RunStateError(Exception):
+    pass
+
+
+class RunState:
+    """ Tasks completed by pipeline runs, with the fingerprint they completed with.
+    Base class of the run states.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.completed = {}
+
+    def add(self, row):
+        self.completed[(row['run_id'], row['task'], row['name'])] = row['fingerprint']
+
+    def is_completed(self, run_id, task, name, fingerprint):
+        """ Returns True if the task completed in the run with the same fingerprint. """
+        return self.completed.get((run_id, task, name)) == fingerprint
+
+
+class LocalRunState(RunState):
+    """ Run state stored in a local JSON lines file, one line per task completed.
+
+    Parameters:
+        path (string): path to the run state file from PROJECT_ROOT. Created if it does not exist.
+
+    Example:
+        >>> state = LocalRunState("state/pipeline.jsonl")
+        >>> state.record("run_1", "create_table", "data.table1", "e3b0c4...")
+        >>> state.is_completed("run_1", "create_table", "data.table1", "e3b0c4...")
+        True
+    """
+    def __init__(self, path):
+        super().__init__()
+        self.path = os.path.join(os.getenv("PROJECT_ROOT", ""), path)
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as file:
+                for line in file:
+                    if line.strip():
+                        self.add(json.loads(line))
+
+    def record(self, run_id, task, name, fingerprint):
+        """ Records the completion of a task in the run. """
+        row = {
+            "run_id": run_id,
+            "task": task,
+            "name": name,
+            "fingerprint": fingerprint,
+            "completed_at": datetime.utcnow().isoformat()
+        }
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(row) + "\n")
+            self.add(row)
+
+
+class BigQueryRunState(RunState):
+    """ Run state stored in a BigQuery log table, one row per task completed.
+
+    Parameters:
+        bq (BigQueryExecutor): BigQuery handler.
+        table_id (string): BigQuery log table ID. Created if it does not exist.
+        dataset_id (string): BigQuery dataset ID.
+        project_id (string): BigQuery project ID.
+        run_id (string): only the records of this run are loaded. Defaults to all the runs.
+    """
+    def __init__(self, bq, table_id, dataset_id=bq_default_dataset(),
+                 project_id=bq_default_project(), run_id=None):
+        super().__init__()
+        self.bq = bq
+        self.table_id = table_id
+        self.dataset_id = dataset_id
+        self.project_id = project_id
+        table = bigquery.Table(
+            self.bq.get_table_ref(dataset_id, table_id, project_id=project_id),
+            schema=run_state_schema()
+        )
+        self.bq.client.create_table(table, exists_ok=True)
+        sql = f"SELECT run_id, task, name, fingerprint FROM `{project_id}.{dataset_id}.{table_id}`"
+        job_config = bigquery.QueryJobConfig()
+        if run_id is not None:
+            sql += " WHERE run_id = @run_id"
+            job_config.query_parameters = [
+                bigquery.ScalarQueryParameter("run_id", "STRING", run_id)
+            ]
+        sql += " ORDER BY completed_at"
+        job = self.bq.client.query(sql, job_config=job_config, project=project_id)
+        rows = self.bq.wait_for_job(
+            job,
+            task='load_run_state',
+            table=f"{project_id}.{dataset_id}.{table_id}"
+        )
+        for row in rows:
+            self.add(dict(row.items()))
+
+    def record(self, run_id, task, name, fingerprint):
+        """ Records the completion of a task in the run.
+
+        Raises:
+            RunStateError if the row cannot be streamed to the log table: the task would be run
+            again on resume.
+        """
+        row = {
+            "run_id": run_id,
+            "task": task,
+            "name": name,
+            "fingerprint": fingerprint,
+            "completed_at": datetime.utcnow().isoformat()
+        }
+        table = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
+        try:
+            errors = self.bq.client.insert_rows_json(
+                self.bq.get_table_ref(self.dataset_id, self.table_id, project_id=self.project_id),
+                [row]
+            )
+        except Exception as error:
+            raise RunStateError(
+                f"Failed to record {task} {name} of {run_id} in {table}: {error}"
+            ) from error
+        if errors:
+            raise RunStateError(
+                f"Failed to record {task} {name} of {run_id} in {table}: {json.dumps(errors)}"
+            )
+        with self.lock:
+            self.add(row)
+
+
+def run_state_schema():
+    """ Schema of the BigQuery run state log table """
+    return [
+        bigquery.SchemaField("run_id", "STRING"),
+        bigquery.SchemaField("task", "STRING"),
+        bigquery.SchemaField("name", "STRING"),
+        bigquery.SchemaField("fingerprint", "STRING"),
+        bigquery.SchemaField("completed_at", "TIMESTAMP")
+    ]
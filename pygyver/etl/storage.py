@@ -4,12 +4,13 @@ import io
 import json
 import logging
 import pandas as pd
-from google.cloud import storage
-from google.oauth2 import service_account
+import pyarrow as pa
+import pyarrow.parquet as pq
 from botocore.exceptions import ClientError
 import boto3
+from pygyver.etl import clients
 from pygyver.etl.lib import gcs_default_project, gcs_default_bucket,  \
-    bq_token_file_valid, bq_token_file_path, s3_default_root, s3_default_bucket, remove_first_slash
+    s3_default_root, s3_default_bucket, remove_first_slash
 
 def s3_get_file_json(file_name):  # to be removed after the code migration in waxit
     """ Gets file from S3 """
@@ -198,16 +199,11 @@ class GCSExecutor:
 
     def auth(self):
         """
-        Authentificates using the access token
+        Authentificates using the access token.
+        The credentials and the client are shared by the executors of the process.
         """
-        bq_token_file_valid()
-        self.credentials = service_account.Credentials.from_service_account_file(
-            bq_token_file_path()
-        )
-        self.client = storage.Client(
-            credentials=self.credentials,
-            project=self.project_id
-        )
+        self.credentials = clients.get_credentials(clients.storage_scopes())
+        self.client = clients.storage_client(self.project_id)
 
     def set_bucket(self,
                    gcs_bucket=gcs_default_bucket()
@@ -236,6 +232,32 @@ class GCSExecutor:
         logging.info(f"Writing DataFrame to gs://{gcs_bucket}/{blob.name}")
         blob.upload_from_string(df.to_csv(index=index), 'text/csv')
 
+    def df_to_gcs_parquet(self,
+                          gcs_path,
+                          df,
+                          gcs_bucket=gcs_default_bucket(),
+                          index=False,
+                          schema=None
+                         ):
+        """
+        Writes pandas Dataframe to parquet on GCS, which preserves the column types
+        gcs_path: path to file in GCS
+        df: pandas Dataframe to be uploaded
+        gcs_bucket: the GCS bucket, by default uses the GCS_BUCKET env
+        index: keeps the Dataframe index in file
+        schema: pyarrow schema the columns are converted to, e.g. shared by the files of a load.
+        Defaults to None: inferred from the Dataframe
+        """
+        self.set_bucket(gcs_bucket=gcs_bucket)
+        blob = self.bucket.blob(gcs_path)
+
+        buffer = io.BytesIO()
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=index)
+        # BigQuery reads timestamps in micro seconds at most
+        pq.write_table(table, buffer, coerce_timestamps='us', allow_truncated_timestamps=True)
+        logging.info(f"Writing DataFrame to gs://{gcs_bucket}/{blob.name}")
+        blob.upload_from_string(buffer.getvalue(), 'application/octet-stream')
+
     def download_file(self,
                       gcs_path,
                       file_path,
@@ -31,6 +31,7 @@ setuptools.setup(
         'codecov>=2.1.0',
         'facebook-business>=6.0.0',
         'google-cloud-bigquery>=1.24.0',
+        'google-cloud-bigquery-storage>=1.0.0',
         'google-cloud-storage>=1.28.0',
         'gspread>=3.1.0',
         'gspread-dataframe>=3.0.4',
@@ -0,0 +1,108 @@
+""" Audit Tests """
+import unittest
+from datetime import datetime
+from unittest import mock
+from pygyver.etl.dw import BigQueryExecutor
+from pygyver.etl.audit import RunSummary
+from pygyver.etl.audit import BigQueryAuditLog
+from pygyver.etl.audit import job_statistics
+
+
+def query_job(job_id, table_id, slot_millis, bytes_processed):
+    job = mock.Mock(
+        job_id=job_id,
+        job_type='query',
+        state='DONE',
+        error_result=None,
+        created=datetime(2020, 1, 1, 0, 0, 0),
+        started=datetime(2020, 1, 1, 0, 0, 2),
+        ended=datetime(2020, 1, 1, 0, 0, 5),
+        total_bytes_processed=bytes_processed,
+        total_bytes_billed=bytes_processed,
+        slot_millis=slot_millis,
+        cache_hit=False
+    )
+    job.destination.project = 'project'
+    job.destination.dataset_id = 'test'
+    job.destination.table_id = table_id
+    return job
+
+
+class JobStatisticsTest(unittest.TestCase):
+    """ Test """
+    def test_job_statistics(self):
+        record = job_statistics(query_job('job_1', 'table1', 1000, 2048), task='create_table')
+        self.assertEqual(record['task'], 'create_table')
+        self.assertEqual(record['table'], 'project.test.table1')
+        self.assertIsNone(record['partition'])
+        self.assertEqual(record['job_id'], 'job_1')
+        self.assertEqual(record['queue_ms'], 2000)
+        self.assertEqual(record['wall_ms'], 5000)
+        self.assertEqual(record['total_bytes_processed'], 2048)
+        self.assertEqual(record['total_slot_ms'], 1000)
+        self.assertFalse(record['cache_hit'])
+
+    def test_job_statistics_partition(self):
+        record = job_statistics(query_job('job_1', 'table1$20200101', 1000, 2048))
+        self.assertEqual(record['task'], 'query')
+        self.assertEqual(record['table'], 'project.test.table1')
+        self.assertEqual(record['partition'], '20200101')
+
+
+class RunSummaryTest(unittest.TestCase):
+    """ Test """
+    def setUp(self):
+        self.summary = RunSummary()
+        self.summary.add(job_statistics(query_job('job_1', 'table1', 100, 10), task='create_table'))
+        self.summary.add(job_statistics(query_job('job_2', 'table2$20200101', 700, 30), task='create_partition_table'))
+        self.summary.add(job_statistics(query_job('job_3', 'table2$20200102', 200, 60), task='create_partition_table'))
+
+    def test_totals(self):
+        self.assertEqual(
+            self.summary.totals(),
+            {"jobs": 3, "wall_ms": 15000, "total_bytes_processed": 100, "total_slot_ms": 1000}
+        )
+
+    def test_top_tables(self):
+        top = self.summary.top_tables(by='total_slot_ms', n=1)
+        self.assertEqual(top['table'].tolist(), ['project.test.table2'])
+        self.assertEqual(top['jobs'].tolist(), [2])
+        self.assertEqual(top['slot_share'].tolist(), [0.9])
+
+    def test_audit_log(self):
+        audit_log = mock.Mock()
+        summary = RunSummary(audit_log=audit_log)
+        summary.add(job_statistics(query_job('job_1', 'table1', 100, 10)))
+        audit_log.record.assert_called_once()
+        self.assertEqual(len(summary), 1)
+
+    def test_max_records(self):
+        summary = RunSummary(max_records=2)
+        for i in range(3):
+            summary.add(job_statistics(query_job(f'job_{i}', 'table1', 100, 10)))
+        self.assertEqual([record['job_id'] for record in summary.records], ['job_1', 'job_2'])
+        summary.clear()
+        self.assertEqual(len(summary), 0)
+
+
+class BigQueryAuditLogTest(unittest.TestCase):
+    """ Test """
+    def setUp(self):
+        self.db = BigQueryExecutor()
+        self.db.create_dataset(dataset_id='test')
+
+    def tearDown(self):
+        self.db.delete_table(dataset_id='test', table_id='test_audit')
+        self.db.delete_table(dataset_id='test', table_id='test_audit_table1')
+
+    def test_record(self):
+        self.db.summary.audit_log = BigQueryAuditLog(self.db, table_id='test_audit', dataset_id='test', run_id='run_1')
+        self.db.create_table(dataset_id='test', table_id='test_audit_table1', sql="SELECT 1 AS a")
+        record = self.db.summary.records[-1]
+        self.assertEqual(record['task'], 'create_table')
+        self.assertIsNotNone(record['job_id'])
+        self.assertIsNotNone(record['total_slot_ms'])
+
+
+if __name__ == "__main__":
+    unittest.main()
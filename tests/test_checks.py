@@ -0,0 +1,149 @@
+""" Checks Tests """
+import unittest
+from pygyver.etl.checks import build_checks
+from pygyver.etl.checks import check_query
+from pygyver.etl.checks import check_passed
+from pygyver.etl.checks import check_results
+
+
+class BuildChecksTest(unittest.TestCase):
+    """ Test """
+    def test_build_checks(self):
+        checks = build_checks(
+            {
+                "not_null": ["col1", "col2"],
+                "accepted_values": {"status": ["open", "closed"]},
+                "row_count": {"max_delta": 0.2},
+                "freshness": {"column": "updated_at", "max_age_hours": 24},
+                "relationships": [
+                    {
+                        "column": "product_id",
+                        "table_id": "product",
+                        "dataset_id": "reporting",
+                        "project_id": "project",
+                        "field": "id"
+                    }
+                ]
+            },
+            primary_key=["col1"],
+            previous_row_count=100
+        )
+        self.assertEqual(
+            [(check['check'], check['column']) for check in checks],
+            [
+                ('unique', 'col1'), ('not_null', 'col1'), ('not_null', 'col2'),
+                ('accepted_values', 'status'), ('row_count', None), ('freshness', 'updated_at'),
+                ('relationships', 'product_id')
+            ]
+        )
+        self.assertEqual(checks[4]['min'], 1)
+        self.assertEqual(checks[4]['previous_row_count'], 100)
+        self.assertEqual(checks[6]['table'], 'project.reporting.product')
+
+    def test_build_checks_empty(self):
+        self.assertEqual(build_checks(), [])
+        self.assertEqual(build_checks({}, primary_key=[]), [])
+
+    def test_build_checks_unknown(self):
+        with self.assertRaises(ValueError):
+            build_checks({"not_empty": ["col1"]})
+
+
+class CheckQueryTest(unittest.TestCase):
+    """ Test """
+    def test_check_query(self):
+        checks = build_checks(
+            {
+                "accepted_values": {"status": ["open", "it's closed"]},
+                "relationships": [
+                    {
+                        "column": "product_id",
+                        "table_id": "product",
+                        "dataset_id": "reporting",
+                        "project_id": "project",
+                        "field": "id"
+                    }
+                ]
+            },
+            primary_key=["col1", "col2"]
+        )
+        self.assertEqual(
+            check_query("project.data.table1", checks),
+            "SELECT\n"
+            "    COUNT(*) - COUNT(DISTINCT TO_JSON_STRING(STRUCT(t.`col1`, t.`col2`)))"
+            " AS check_0,\n"
+            "    COUNTIF(t.`status` IS NOT NULL AND t.`status` NOT IN ('open', 'it''s closed'))"
+            " AS check_1,\n"
+            "    COUNTIF(t.`product_id` IS NOT NULL AND reference_0.key IS NULL) AS check_2\n"
+            "FROM `project.data.table1` AS t\n"
+            "LEFT JOIN (SELECT DISTINCT `id` AS key FROM `project.reporting.product`) "
+            "AS reference_0 ON t.`product_id` = reference_0.key"
+        )
+
+    def test_check_query_reserved_keywords(self):
+        checks = build_checks(
+            {"not_null": ["order"], "freshness": {"column": "timestamp", "max_age_hours": 1}}
+        )
+        self.assertEqual(
+            check_query("project.data.table1", checks),
+            "SELECT\n"
+            "    COUNTIF(t.`order` IS NULL) AS check_0,\n"
+            "    TIMESTAMP_DIFF(CURRENT_TIMESTAMP(), CAST(MAX(t.`timestamp`) AS TIMESTAMP), SECOND)"
+            " / 3600 AS check_1\n"
+            "FROM `project.data.table1` AS t"
+        )
+
+    def test_check_query_single_scan(self):
+        checks = build_checks({"not_null": ["col1", "col2", "col3"], "row_count": {}})
+        sql = check_query("project.data.table1", checks)
+        self.assertEqual(sql.count("FROM"), 1)
+        self.assertEqual(sql.count(" AS check_"), 4)
+
+
+class CheckPassedTest(unittest.TestCase):
+    """ Test """
+    def test_count_checks(self):
+        check = build_checks({"not_null": ["col1"]})[0]
+        self.assertTrue(check_passed(check, 0))
+        self.assertFalse(check_passed(check, 2))
+
+    def test_row_count(self):
+        check = build_checks(
+            {"row_count": {"min": 10, "max": 100, "max_delta": 0.5}},
+            previous_row_count=40
+        )[0]
+        self.assertTrue(check_passed(check, 50))
+        self.assertFalse(check_passed(check, 5))
+        self.assertFalse(check_passed(check, 150))
+        self.assertFalse(check_passed(check, 80))
+
+    def test_row_count_no_previous(self):
+        check = build_checks({"row_count": {"max_delta": 0.1}})[0]
+        self.assertTrue(check_passed(check, 1000))
+        self.assertFalse(check_passed(check, 0))
+
+    def test_freshness(self):
+        check = build_checks({"freshness": {"column": "updated_at", "max_age_hours": 24}})[0]
+        self.assertTrue(check_passed(check, 2.5))
+        self.assertFalse(check_passed(check, 30))
+        self.assertFalse(check_passed(check, None))
+
+    def test_check_results(self):
+        checks = build_checks({"not_null": ["col1"]}, primary_key=["col1"])
+        self.assertEqual(
+            check_results("project.data.table1", checks, {"check_0": 1, "check_1": 0}),
+            [
+                {
+                    "table": "project.data.table1", "check": "unique", "column": "col1",
+                    "value": 1, "passed": False
+                },
+                {
+                    "table": "project.data.table1", "check": "not_null", "column": "col1",
+                    "value": 0, "passed": True
+                }
+            ]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+""" Clients Tests """
+import unittest
+from pygyver.etl import clients
+from pygyver.etl import gs
+from pygyver.etl.dw import BigQueryExecutor
+from pygyver.etl.storage import GCSExecutor
+
+
+class SharedClientsTest(unittest.TestCase):
+    """ Test """
+    def setUp(self):
+        clients.clear()
+
+    def tearDown(self):
+        clients.clear()
+
+    def test_get_credentials(self):
+        credentials = clients.get_credentials(clients.bigquery_scopes())
+        self.assertIs(clients.get_credentials(clients.bigquery_scopes()), credentials)
+        self.assertIsNot(clients.get_credentials(clients.gspread_scopes()), credentials)
+
+    def test_bigquery_executor(self):
+        bq_1 = BigQueryExecutor()
+        bq_2 = BigQueryExecutor()
+        self.assertIs(bq_1.client, bq_2.client)
+        self.assertIs(bq_1.credentials, bq_2.credentials)
+        self.assertIsNot(bq_1.summary, bq_2.summary)
+
+    def test_gcs_executor(self):
+        self.assertIs(GCSExecutor().client, GCSExecutor().client)
+
+    def test_gcs_executor_call(self):
+        gcs = GCSExecutor()
+        gcs.set_bucket()
+        self.assertIsNotNone(gcs.bucket.name)
+        self.assertIsNotNone(gcs.client._credentials.scopes)
+
+    def test_bigquery_executor_call(self):
+        self.assertIsInstance(BigQueryExecutor().dataset_exists(dataset_id='test'), bool)
+
+    def test_gspread_client(self):
+        self.assertIs(gs.gspread_client(), gs.gspread_client())
+
+    def test_clear(self):
+        client = BigQueryExecutor().client
+        clients.clear()
+        self.assertIsNot(BigQueryExecutor().client, client)
+
+
+if __name__ == "__main__":
+    unittest.main()
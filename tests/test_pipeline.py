@@ -1,7 +1,11 @@
+import os
 import time
 import asyncio
+import tempfile
 import logging
 import unittest
+import threading
+import concurrent.futures
 from unittest import mock
 from google.cloud import bigquery
 from pygyver.etl.dw import BigQueryExecutor
@@ -9,6 +13,7 @@ import pygyver.etl.pipeline as pl
 from pygyver.etl.lib import add_dataset_prefix
 from pygyver.etl.lib import bq_default_project
 from pygyver.etl.lib import bq_default_prod_project
+from pygyver.etl.run_state import LocalRunState
 
 class TestPipelineExtractuUnitTests(unittest.TestCase):
 
@@ -476,6 +481,19 @@ class TestPipelineCopyTableStructure(unittest.TestCase):
             "all table's structure are copied"
         )
 
+    def test_copy_prod_structure_clone(self):
+        with mock.patch.object(self.p_ex.bq, 'clone_table') as clone_table:
+            self.p_ex.copy_prod_structure(['reporting.out_product'], clone=True, recent_days=7)
+        clone_table.assert_called_once_with(
+            source_project_id=bq_default_prod_project(),
+            source_dataset_id='reporting',
+            source_table_id='out_product',
+            dest_dataset_id='1001_reporting',
+            dest_table_id='out_product',
+            dest_project_id=bq_default_project(),
+            recent_days=7
+        )
+
 class TestPipelineDryRun(unittest.TestCase):
     def setUp(self):
         self.bq_client = BigQueryExecutor()
@@ -567,6 +585,294 @@ class TestExecute_parallel(unittest.TestCase):
                     [{"status": "ok"}, {"status": "ok"}, {"status": "error"}, {"status": "ok"}]
                 )
 
+    def test_error_raised_with_report(self):
+        with self.assertRaises(pl.PipelineExecutorError) as context:
+            pl.execute_parallel(
+                    self.bug,
+                    [{"status": "ok"}, {"status": "ok"}, {"status": "error"}, {"status": "ok"}]
+                )
+        report = context.exception.report
+        self.assertEqual(len(report.succeeded), 3)
+        self.assertEqual(report.failed[0][0], {"status": "error"})
+        self.assertEqual(str(context.exception.__cause__), "error something")
+
+    def sleep_or_bug(self, status):
+        if status == "error":
+            raise Exception("error something")
+        time.sleep(0.5)
+
+    def test_fail_fast(self):
+        cancel = mock.Mock()
+        list_values = [{"status": "error"}] + [{"status": "ok"} for i in range(5)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            with self.assertRaises(pl.PipelineExecutorError) as context:
+                pl.execute_parallel(
+                        self.sleep_or_bug,
+                        list_values,
+                        executor=executor,
+                        fail_fast=True,
+                        cancel=cancel)
+        report = context.exception.report
+        cancel.assert_called_once_with()
+        self.assertEqual(len(report.failed), 1)
+        self.assertEqual(len(report.succeeded) + len(report.cancelled), 5)
+        self.assertGreater(len(report.cancelled), 0)
+
+    def test_execute_dag_skips_downstream_of_failure(self):
+        tasks = [
+            {"name": "table1", "func": self.bug, "args": {"status": "error"}, "message": "test"},
+            {"name": "table2", "func": self.bug, "args": {"status": "ok"}, "message": "test"},
+            {"name": "table3", "func": self.bug, "args": {"status": "ok"}, "message": "test"},
+        ]
+        with self.assertRaises(pl.PipelineExecutorError) as context:
+            pl.execute_dag(tasks, [set(), {0}, set()])
+        report = context.exception.report
+        self.assertEqual(report.succeeded, [{"name": "table3"}])
+        self.assertEqual(report.cancelled, [{"name": "table2"}])
+
+    def test_shared_executor_with_limit(self):
+        start_time = time.time()
+        list_values = [{"num": str(i)} for i in range(4)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            pl.execute_parallel(
+                    self.sleep_2_sec,
+                    list_values,
+                    executor=executor,
+                    limit=threading.BoundedSemaphore(2))
+            # the shared executor is still usable after execute_parallel
+            pl.execute_parallel(
+                    self.sleep_2_sec,
+                    list_values[:1],
+                    executor=executor)
+        end_time = time.time()
+        self.assertGreater(end_time-start_time, 6, "limit is applied")
+        self.assertLess(end_time-start_time, 7, "right execution time")
+
+
+class TestPipelineConcurrency(unittest.TestCase):
+    def test_default_concurrency(self):
+        p_ex = pl.PipelineExecutor("tests/yaml/test_dummy.yaml")
+        self.assertEqual(p_ex.max_workers, 10)
+        self.assertEqual(p_ex.limits, {"query": None, "metadata": None, "load": None})
+
+    def test_concurrency_from_yaml_and_constructor(self):
+        p_ex = pl.PipelineExecutor("tests/yaml/test_concurrency.yaml", concurrency={"query": 5})
+        self.assertEqual(p_ex.max_workers, 20)
+        self.assertEqual(p_ex.limits["query"]._initial_value, 5)
+        self.assertEqual(p_ex.limits["metadata"]._initial_value, 8)
+        self.assertIsNone(p_ex.limits["load"])
+
+    def test_invalid_concurrency_key(self):
+        with self.assertRaises(KeyError):
+            pl.PipelineExecutor("tests/yaml/test_dummy.yaml", concurrency={"queries": 5})
+
+    def test_run_shuts_down_executor(self):
+        p_ex = pl.PipelineExecutor("tests/yaml/test_dummy.yaml")
+        executor = p_ex.executor
+        with mock.patch.object(p_ex, 'run_releases'), \
+                mock.patch.object(p_ex, 'run_batches', side_effect=pl.PipelineExecutorError):
+            with self.assertRaises(pl.PipelineExecutorError):
+                p_ex.run()
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+        self.assertIsNot(p_ex.executor, executor, "a new pool is created after shutdown")
+        p_ex.shutdown()
+
+    def test_context_manager_shuts_down_executor(self):
+        with pl.PipelineExecutor("tests/yaml/test_dummy.yaml") as p_ex:
+            executor = p_ex.executor
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def test_extract_table_references(self):
+        self.assertEqual(
+            pl.extract_table_references(
+                "SELECT * FROM `project.data.table1` JOIN `staging.table2` USING (col1) WHERE col2 = '`'"
+            ),
+            {"data.table1", "staging.table2"},
+            "references well extracted"
+        )
+
+    def test_build_dependency_graph(self):
+        tasks = [
+            {"name": "test.table1", "references": {"source.table0"}},
+            {"name": "test.table2", "references": {"test.table3"}},
+            {"name": "test.table3", "references": {"test.table1"}},
+            {"name": "test.table1", "references": {"test.table1"}},
+        ]
+        self.assertEqual(
+            pl.build_dependency_graph(tasks),
+            [set(), {2}, {0, 3}, {0}],
+            "dependencies well built"
+        )
+
+    def test_build_dependency_graph_cycle(self):
+        tasks = [
+            {"name": "test.table1", "references": {"test.table2"}},
+            {"name": "test.table2", "references": {"test.table1"}},
+        ]
+        with self.assertRaises(pl.PipelineExecutorError):
+            pl.build_dependency_graph(tasks)
+
+    def append_name(self, name, done):
+        time.sleep(0.1)
+        done.append(name)
+
+    def test_execute_dag_order(self):
+        done = []
+        tasks = [
+            {"name": name, "func": self.append_name, "args": {"name": name, "done": done}, "message": "test"}
+            for name in ["table1", "table2", "table3"]
+        ]
+        pl.execute_dag(tasks, [{2}, set(), {1}])
+        self.assertEqual(done, ["table2", "table3", "table1"], "tasks executed in dependency order")
+
+
+class TestPipelineDag(unittest.TestCase):
+    def setUp(self):
+        self.bq_client = BigQueryExecutor()
+        self.p_ex = pl.PipelineExecutor("tests/yaml/test_dry_run_with_args.yaml",
+                                        my_string_arg='one',
+                                        my_dataset_arg='test')
+
+    def test_extract_tasks(self):
+        tasks = self.p_ex.extract_tasks()
+        self.assertEqual(
+            [(t['name'], t['references']) for t in tasks],
+            [("test.table1", set()), ("test.table2", {"test.table1"})],
+            "tasks well extracted"
+        )
+        self.assertEqual(
+            pl.build_dependency_graph(tasks),
+            [set(), {0}]
+        )
+
+    def test_batch_datasets(self):
+        self.assertEqual(
+            self.p_ex.batch_datasets(),
+            {(bq_default_project(), "test")}
+        )
+
+
+class TestPipelineChecks(unittest.TestCase):
+    def setUp(self):
+        self.p_ex = pl.PipelineExecutor("tests/yaml/test_run.yaml")
+        self.batch = self.p_ex.yaml['batches'][1]
+
+    def test_run_checks(self):
+        result = {"table": "table1", "check": "not_null", "column": "col1", "value": 0, "passed": True}
+        with mock.patch.object(self.p_ex.bq, 'assert_checks', return_value=[result]) as assert_checks:
+            self.p_ex.run_checks(self.batch)
+        self.assertEqual(assert_checks.call_count, 3)
+        calls = {call[1]['table_id']: call[1] for call in assert_checks.call_args_list}
+        self.assertEqual(calls['table1']['primary_key'], ['col1', 'col2'])
+        self.assertEqual(calls['table1']['checks']['not_null'], ['col1', 'col2'])
+        self.assertEqual(calls['table3']['primary_key'], [])
+        self.assertEqual(self.p_ex.check_results, [result] * 3)
+        self.assertNotIn('primary_key', self.batch['tables'][0]['create_table'])
+
+    def test_run_checks_failed(self):
+        error = AssertionError("Table failed checks")
+        error.results = [{"table": "table2", "check": "unique", "column": "col1", "value": 1, "passed": False}]
+        with mock.patch.object(self.p_ex.bq, 'assert_checks', side_effect=error):
+            with self.assertRaises(AssertionError):
+                self.p_ex.run_checks(self.batch)
+        self.assertEqual(len(self.p_ex.check_results), 3)
+
+    def test_previous_row_count(self):
+        content = {"create_table": {"table_id": "table1", "dataset_id": "test"}, "checks": {"row_count": {"max_delta": 0.1}}}
+        with mock.patch.object(self.p_ex.bq, 'table_exists', return_value=True), \
+                mock.patch.object(self.p_ex.bq, 'get_table', return_value=mock.Mock(num_rows=10)):
+            self.assertEqual(self.p_ex.previous_row_count(content), 10)
+        self.assertIsNone(self.p_ex.previous_row_count(self.batch['tables'][0]))
+
+
+class TestPipelineEstimateCost(unittest.TestCase):
+    def setUp(self):
+        self.p_ex = pl.PipelineExecutor("tests/yaml/test_run.yaml")
+        self.p_ex.bq.dry_run_sql = mock.Mock(return_value=2 ** 40)
+
+    def test_estimate_cost(self):
+        estimate = self.p_ex.estimate_cost()
+        self.assertEqual(
+            sorted(record['table'] for record in estimate.records),
+            ["test.table1", "test.table2", "test.table3"]
+        )
+        self.assertEqual(estimate.by_batch(), {1: 3 * 2 ** 40})
+        self.assertEqual(estimate.cost(), 3 * pl.on_demand_price_per_tib())
+        self.assertEqual(estimate.errors, [])
+
+    def test_estimate_cost_budget(self):
+        with self.assertRaises(pl.PipelineExecutorError):
+            self.p_ex.estimate_cost(max_bytes=2 ** 40)
+
+    def test_estimate_cost_error(self):
+        self.p_ex.bq.dry_run_sql.side_effect = Exception("Not found: Table test.table1")
+        estimate = self.p_ex.estimate_cost()
+        self.assertEqual(len(estimate.errors), 3)
+        self.assertEqual(estimate.total_bytes, 0)
+
+    def test_estimate_cost_error_budget(self):
+        self.p_ex.bq.dry_run_sql.side_effect = Exception("Not found: Table test.table1")
+        with self.assertRaises(pl.PipelineExecutorError):
+            self.p_ex.estimate_cost(max_bytes=10 * 2 ** 40)
+
+
+class TestPipelineResume(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.run_state = LocalRunState(os.path.join(self.directory.name, "state.jsonl"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume_requires_run_state(self):
+        with self.assertRaises(pl.PipelineExecutorError):
+            pl.PipelineExecutor("tests/yaml/test_dummy.yaml", resume=True)
+
+    def test_resume_requires_run_id(self):
+        with self.assertRaises(pl.PipelineExecutorError):
+            pl.PipelineExecutor("tests/yaml/test_dummy.yaml", run_state=self.run_state, resume=True)
+
+    def test_run_checkpointed(self):
+        func = mock.Mock()
+        args = {"table_id": "table1", "dataset_id": "test", "sql": "SELECT 1"}
+        p_ex = pl.PipelineExecutor("tests/yaml/test_dummy.yaml", run_state=self.run_state, run_id="run_1")
+        p_ex.run_checkpointed('create_table', func, **args)
+        self.assertEqual(func.call_count, 1)
+
+        p_ex = pl.PipelineExecutor("tests/yaml/test_dummy.yaml", run_state=self.run_state, run_id="run_1", resume=True)
+        p_ex.run_checkpointed('create_table', func, **args)
+        self.assertEqual(func.call_count, 1, "completed task is skipped")
+        p_ex.run_checkpointed('create_table', func, **dict(args, sql="SELECT 2"))
+        self.assertEqual(func.call_count, 2, "task with a new SQL is executed")
+
+        p_ex = pl.PipelineExecutor("tests/yaml/test_dummy.yaml", run_state=self.run_state, run_id="run_2", resume=True)
+        p_ex.run_checkpointed('create_table', func, **args)
+        self.assertEqual(func.call_count, 3, "task completed in another run is executed")
+
+    def test_run_checkpointed_checks(self):
+        func = mock.Mock()
+        args = {"table_id": "table1", "dataset_id": "test", "checks": {"not_null": ["col1"]}}
+        p_ex = pl.PipelineExecutor(
+            "tests/yaml/test_dummy.yaml", run_state=self.run_state, run_id="run_1"
+        )
+        p_ex.run_checkpointed('assert_checks', func, previous_row_count=10, **args)
+
+        p_ex = pl.PipelineExecutor(
+            "tests/yaml/test_dummy.yaml", run_state=self.run_state, run_id="run_1", resume=True
+        )
+        p_ex.run_checkpointed('assert_checks', func, previous_row_count=12, **args)
+        self.assertEqual(func.call_count, 1, "checks are skipped whatever the row count")
+        p_ex.run_checkpointed(
+            'assert_checks', func, previous_row_count=12, **dict(args, checks={"unique": ["col1"]})
+        )
+        self.assertEqual(func.call_count, 2, "new checks are executed")
+
+
 class TestPipelinePerformance(unittest.TestCase):
     def setUp(self):
         logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,68 @@
+""" Run state Tests """
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pygyver.etl.dw import BigQueryExecutor
+from pygyver.etl.run_state import LocalRunState
+from pygyver.etl.run_state import BigQueryRunState
+from pygyver.etl.run_state import RunStateError
+
+
+class LocalRunStateTest(unittest.TestCase):
+    """ Test """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state", "pipeline.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_record(self):
+        state = LocalRunState(self.path)
+        self.assertFalse(state.is_completed("run_1", "create_table", "test.table1", "abc"))
+        state.record("run_1", "create_table", "test.table1", "abc")
+        self.assertTrue(state.is_completed("run_1", "create_table", "test.table1", "abc"))
+        self.assertFalse(state.is_completed("run_1", "create_table", "test.table1", "def"))
+        self.assertFalse(state.is_completed("run_2", "create_table", "test.table1", "abc"))
+
+    def test_reload(self):
+        LocalRunState(self.path).record("run_1", "create_table", "test.table1", "abc")
+        LocalRunState(self.path).record("run_1", "create_table", "test.table1", "def")
+        state = LocalRunState(self.path)
+        self.assertTrue(state.is_completed("run_1", "create_table", "test.table1", "def"))
+        self.assertFalse(state.is_completed("run_1", "create_table", "test.table1", "abc"))
+
+
+class BigQueryRunStateTest(unittest.TestCase):
+    """ Test """
+    def setUp(self):
+        self.db = BigQueryExecutor()
+        self.db.create_dataset(dataset_id='test')
+
+    def tearDown(self):
+        self.db.delete_table(dataset_id='test', table_id='test_run_state')
+
+    def test_record(self):
+        state = BigQueryRunState(
+            self.db, table_id='test_run_state', dataset_id='test', run_id='run_1'
+        )
+        state.record("run_1", "create_table", "test.table1", "abc")
+        state = BigQueryRunState(
+            self.db, table_id='test_run_state', dataset_id='test', run_id='run_1'
+        )
+        self.assertTrue(state.is_completed("run_1", "create_table", "test.table1", "abc"))
+
+    def test_record_error(self):
+        state = BigQueryRunState(
+            self.db, table_id='test_run_state', dataset_id='test', run_id='run_1'
+        )
+        errors = [{"index": 0, "errors": [{"reason": "invalid"}]}]
+        with mock.patch.object(self.db.client, 'insert_rows_json', return_value=errors):
+            with self.assertRaises(RunStateError):
+                state.record("run_1", "create_table", "test.table1", "abc")
+        self.assertFalse(state.is_completed("run_1", "create_table", "test.table1", "abc"))
+
+
+if __name__ == "__main__":
+    unittest.main()